@@ -0,0 +1,155 @@
+import difflib
+import json
+import platform
+import random
+import tracemalloc
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Tuple
+
+from code import Sentence
+from code import advanced_weight
+from code import encode
+from code import naive_weight
+from code import parse_many
+from code import search
+from utils import NLP
+from utils import Timer
+
+Record = Dict[str, float]
+
+STOP_WORDS = ['the:DT:*', 'a:DT:*', 'of:IN:*', 'to:TO:*', 'in:IN:*', 'on:IN:*', 'and:CC:*', 'her:PRP$:*', 'it:PRP:*']
+TAGS = ['NN', 'NNS', 'NNP', 'JJ', 'RB', 'VBD', 'VBZ', 'VB']
+SIZES = (4, 16, 64, 256, 1024, 4096, 10000)
+
+
+def synthetic_cluster(num_sentences: int, length: int = 20, vocabulary: int = 400, overlap: float = 0.6,
+                      stop_ratio: float = 0.3, seed: int = 0) -> List[Sentence]:
+    rng = random.Random(seed)
+    shared = [f"w{idx}:{TAGS[idx % len(TAGS)]}:_" for idx in range(vocabulary)]
+
+    def word(idx: int, pos: int) -> str:
+        if rng.random() < stop_ratio:
+            return rng.choice(STOP_WORDS)
+        if rng.random() < overlap:
+            return rng.choice(shared)
+        return f"u{idx}x{pos}:{rng.choice(TAGS)}:_"
+
+    return [['<START>', *(word(idx, pos) for pos in range(rng.randint(max(1, length // 2), length * 3 // 2))), '<END>']
+            for idx in range(num_sentences)]
+
+
+def load_corpus(path: str) -> List[str]:
+    with open(path, encoding='utf-8') as f:
+        return ['\n'.join(json.loads(line)['sentences']) for line in f if line.strip()]
+
+
+def measure(stage: str, func: Callable, *args, memory: bool = True) -> Tuple[object, Record]:
+    with Timer(stage, verbose=False) as timer:
+        result = func(*args)
+        seconds = timer()
+
+    peak = 0
+    if memory:
+        tracemalloc.start()
+        func(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return result, {'stage': stage, 'seconds': seconds, 'peak_kb': peak / 1024}
+
+
+def profile(sentences: List[Sentence], num_results: int = 5, min_len: int = 8, memory: bool = True,
+            budget: int = 10000) -> List[Record]:
+    (graph, table), encoding = measure('encode', encode, sentences, memory=memory)
+    naive, naive_weighting = measure('naive_weight', naive_weight, graph, memory=memory)
+    advanced, advanced_weighting = measure('advanced_weight', advanced_weight, graph, table, memory=memory)
+    records = [encoding, naive_weighting, advanced_weighting]
+    for stage, weights in [('traverse_naive', naive), ('traverse_advanced', advanced)]:
+        (_, complete), traversal = measure(stage, search, weights, num_results, min_len, None, budget, memory=memory)
+        records.append({**traversal, 'complete': complete})
+    for record in records:
+        record.update(sentences=len(sentences), tokens=sum(len(s) - 2 for s in sentences), nodes=len(graph))
+
+    return records
+
+
+def run(sizes: Iterable[int] = SIZES, memory: bool = True, budget: int = 10000, **params) -> List[Record]:
+    return [record for size in sizes
+            for record in profile(synthetic_cluster(size, **params), memory=memory, budget=budget)]
+
+
+def run_corpus(clusters: List[str], memory: bool = True, budget: int = 10000) -> List[Record]:
+    parsed, parsing = measure('parse', lambda: list(parse_many(clusters)), memory=memory)
+    parsing.update(sentences=sum(len(c) for c in parsed), tokens=sum(len(s) - 2 for c in parsed for s in c), nodes=0)
+
+    records = [parsing]
+    for idx, sentences in enumerate(parsed):
+        for record in profile(sentences, memory=memory, budget=budget):
+            records.append({**record, 'cluster': idx})
+
+    return records
+
+
+def agreement(reference: List[List[Sentence]], candidate: List[List[Sentence]]) -> Record:
+    matched = total = found = sentences = 0
+    for before, after in zip(reference, candidate):
+        left = [str(token) for sentence in before for token in sentence[1:-1]]
+        right = [str(token) for sentence in after for token in sentence[1:-1]]
+        matcher = difflib.SequenceMatcher(None, left, right, autojunk=False)
+        matched += sum(block.size for block in matcher.get_matching_blocks())
+        total += max(len(left), len(right))
+        kept = {tuple(map(str, sentence)) for sentence in after}
+        found += sum(tuple(map(str, sentence)) in kept for sentence in before)
+        sentences += len(before)
+
+    return {'token_agreement': matched / total if total else 1.0,
+            'sentence_agreement': found / sentences if sentences else 1.0}
+
+
+def run_backends(clusters: List[str], batch_size: int = 64) -> List[Record]:
+    records, reference, fast = [], None, NLP.fast
+    try:
+        for backend in ('full', 'fast'):
+            NLP.configure(fast=backend == 'fast').load()
+            parsed, record = measure(f'parse_{backend}', lambda: list(parse_many(clusters, batch_size)), memory=False)
+            reference = parsed if reference is None else reference
+            tokens = sum(len(s) - 2 for c in parsed for s in c)
+            record.update(backend=backend, sentences=sum(len(c) for c in parsed), tokens=tokens, nodes=0,
+                          tokens_per_second=tokens / record['seconds'] if record['seconds'] else 0.0,
+                          **agreement(reference, parsed))
+            records.append(record)
+    finally:
+        NLP.configure(fast=fast)
+
+    return records
+
+
+def save(records: List[Record], path: str, **meta) -> None:
+    meta.update(python=platform.python_version(), machine=platform.machine())
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta, 'records': records}, f, indent=2)
+
+
+def load(path: str) -> List[Record]:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['records']
+
+
+def compare(baseline: List[Record], current: List[Record], time_threshold: float = 0.25,
+            memory_threshold: float = 0.25, min_seconds: float = 0.001) -> List[str]:
+    reference = {(r['stage'], r['sentences'], r.get('cluster')): r for r in baseline}
+    regressions = []
+    for record in current:
+        before = reference.get((record['stage'], record['sentences'], record.get('cluster')))
+        if before is None:
+            continue
+        label = f"{record['stage']} ({record['sentences']} sentences)"
+        if record['seconds'] > min_seconds and record['seconds'] > before['seconds'] * (1 + time_threshold):
+            regressions.append(f"{label}: {before['seconds']:.4f}s -> {record['seconds']:.4f}s")
+        if before['peak_kb'] and record['peak_kb'] > before['peak_kb'] * (1 + memory_threshold):
+            regressions.append(f"{label}: {before['peak_kb']:.0f}KB -> {record['peak_kb']:.0f}KB")
+
+    return regressions
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from code import Sentence
+from code import encode
+from code import parse
+from code import parse_many
+from code import search
+from code import weigh
+from utils import NLP
+
+Summaries = List[Tuple[List[str], float]]
+
+
+def fingerprint(content: str, ordered: bool = False) -> str:
+    # sentences rather than lines, so reordering them matches however they are wrapped or split across lines
+    text = re.sub(r'\s+', ' ', content).strip()
+    sentences = NLP.segment(text) if text else []
+    return '\n'.join(sentences if ordered else sorted(sentences))
+
+
+class Cache(object):
+    # an LRU in memory over an optional SQLite table, whose entries expire after ttl seconds if one is given
+    def __init__(self, table: str, capacity: int, ttl: Optional[float] = None, path: Optional[str] = None,
+                 max_rows: Optional[int] = None):
+        self.table = table
+        self.capacity = capacity
+        self.ttl = ttl
+        self.path = path
+        self.max_rows = max_rows
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.db = None
+        self.pid = None
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {'hits': self.hits, 'misses': self.misses, 'expired': self.expired, 'size': len(self.memory),
+                'hit_rate': self.hit_rate}
+
+    def connect(self) -> Optional[sqlite3.Connection]:
+        if self.path is None:
+            return None
+
+        if self.db is None or self.pid != os.getpid():
+            self.db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute(f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, value TEXT, stamp REAL)")
+            self.pid = os.getpid()
+
+        return self.db
+
+    def fresh(self, stamp: float) -> bool:
+        return self.ttl is None or time.time() - stamp <= self.ttl
+
+    def load(self, value: str) -> Any:
+        return json.loads(value)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self.lock:
+            if key in self.memory:
+                stamp, value = self.memory[key]
+                if self.fresh(stamp):
+                    self.memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.memory[key]
+                self.expired += 1
+
+            db = self.connect()
+            row = None if db is None else db.execute(f"SELECT value, stamp FROM {self.table} WHERE key = ?",
+                                                     (key,)).fetchone()
+            if row is not None and not self.fresh(row[1]):
+                with db:
+                    db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self.expired += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.remember(key, self.load(row[0]), row[1])
+            return self.memory[key][1]
+
+    def put(self, key: str, value: Any) -> None:
+        with self.lock:
+            stamp = time.time()
+            self.remember(key, value, stamp)
+            db = self.connect()
+            if db is None:
+                return
+
+            with db:
+                db.execute(f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?)", (key, json.dumps(value), stamp))
+                if self.ttl is not None:
+                    db.execute(f"DELETE FROM {self.table} WHERE stamp < ?", (stamp - self.ttl,))
+                if self.max_rows is not None:
+                    db.execute(f"DELETE FROM {self.table} WHERE key IN (SELECT key FROM {self.table} "
+                               f"ORDER BY stamp DESC, rowid DESC LIMIT -1 OFFSET ?)", (self.max_rows,))
+
+    def remember(self, key: str, value: Any, stamp: float) -> None:
+        self.memory[key] = (stamp, value)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.capacity:
+            self.memory.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.memory.clear()
+            self.hits = self.misses = self.expired = 0
+            db = self.connect()
+            if db is not None:
+                with db:
+                    db.execute(f"DELETE FROM {self.table}")
+
+
+class ParseCache(Cache):
+    def __init__(self, capacity: int = 10000, path: Optional[str] = None, max_rows: Optional[int] = None):
+        super().__init__('parses', capacity, None, path, max_rows)
+
+    def key(self, text: str) -> str:
+        return hashlib.sha1(f"{NLP.signature}\0{text}".encode('utf-8')).hexdigest()
+
+    def parse(self, content: str) -> List[Sentence]:
+        return next(self.parse_many([content]))
+
+    def parse_many(self, contents: Iterable[str], batch_size: int = 64) -> Iterator[List[Sentence]]:
+        for content in contents:
+            # sentences are parsed in isolation, so tags may differ from parse(content) where context crosses them
+            text = re.sub(r'\s+', ' ', content).strip()
+            segments = NLP.segment(text) if text else []
+            keys = [self.key(segment) for segment in segments]
+            texts = dict(zip(keys, segments))
+            found = {}
+            for key in texts:
+                sentences = self.get(key)
+                if sentences is not None:
+                    found[key] = sentences
+            missing = [key for key in texts if key not in found]
+            for key, sentences in zip(missing, parse_many((texts[k] for k in missing), batch_size=batch_size)):
+                self.put(key, sentences)
+                found[key] = sentences
+
+            yield [list(sentence) for key in keys for sentence in found[key]]
+
+
+class ResultCache(Cache):
+    def __init__(self, capacity: int = 1000, ttl: Optional[float] = None, path: Optional[str] = None,
+                 max_rows: Optional[int] = None, ordered: bool = False, parser: Optional[ParseCache] = None):
+        super().__init__('results', capacity, ttl, path, max_rows)
+        self.ordered = ordered
+        self.parser = parser
+
+    def key(self, content: str, weighting: str, num_results: int, min_len: int) -> str:
+        params = f"{NLP.signature}\0{weighting}\0{num_results}\0{min_len}"
+        return hashlib.sha1(f"{params}\0{fingerprint(content, self.ordered)}".encode('utf-8')).hexdigest()
+
+    def load(self, value: str) -> Summaries:
+        return [(path, cost) for path, cost in json.loads(value)]
+
+    def summarise(self, content: str, weighting: str = 'advanced', num_results: int = 5, min_len: int = 8,
+                  timeout: Optional[float] = None, budget: Optional[int] = None) -> Tuple[Summaries, bool]:
+        key = self.key(content, weighting, num_results, min_len)
+        summaries = self.get(key)
+        if summaries is not None:
+            return [(list(path), cost) for path, cost in summaries], True
+
+        graph, table = encode(parse(content) if self.parser is None else self.parser.parse(content))
+        summaries, complete = search(weigh(graph, table, weighting), num_results, min_len, timeout, budget)
+        if complete:
+            self.put(key, summaries)
+
+        return summaries, complete
+
+    def compress(self, content: str, weighting: str = 'advanced', num_results: int = 5, min_len: int = 8,
+                 timeout: Optional[float] = None, budget: Optional[int] = None) -> Summaries:
+        return self.summarise(content, weighting, num_results, min_len, timeout, budget)[0]
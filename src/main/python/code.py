@@ -1,126 +1,657 @@
+import heapq
 import itertools
+import json
+import math
+import random
 import re
+import sys
+import time
+import zlib
+from typing import Callable
+from typing import Collection
 from typing import Dict
+from typing import Iterable
+from typing import Iterator
 from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Set
+from typing import TextIO
 from typing import Tuple
 from typing import Union
 
+from utils import METRICS
 from utils import NLP
+from utils import Timer
+from utils import measured
+
+
+class Token(NamedTuple):
+    # the parse-side record of a word: encode takes these or their 'word:TAG:flag' strings, but the graph keys its
+    # nodes by 'word:TAG:flag:id' names, which Token.node reads back where a verb flag or a word is needed
+    word: str
+    tag: Optional[str] = None
+    stop: bool = False
+
+    def __str__(self) -> str:
+        return self.word if self.tag is None else f"{self.word}:{self.tag}:{'*' if self.stop else '_'}"
+
+    @property
+    def verb(self) -> bool:
+        return self.tag is not None and self.tag.startswith('VB')
+
+    @classmethod
+    def parse(cls, text: str) -> 'Token':
+        fields = text.rsplit(':', 2)
+        if len(fields) < 3:
+            return cls(sys.intern(text))
+        return cls(sys.intern(fields[0]), sys.intern(fields[1]), fields[2] == '*')
+
+    @classmethod
+    def node(cls, node: str) -> 'Token':
+        text, _, ident = node.rpartition(':')
+        return cls.parse(text if ident.isdigit() else node)
+
 
 Graph = Dict[str, Dict[str, Union[int, float]]]
-Sentence = List[str]
+Sentence = List[Union[str, Token]]
 Table = Dict[str, Tuple[int, int]]
+Groups = Dict[str, Dict[int, List[int]]]
+
+MERSENNE = (1 << 61) - 1
 
 
-def parse(content: str) -> List[Sentence]:
-    result = []
-    doc = NLP(re.sub(r'\s+', ' ', content).strip())
-    for idx, sent in enumerate(doc.sents):
-        tokens = ['<START>']
-        for token in sent:
-            if not token.is_punct:
-                tokens.append(f"{str(token).lower()}:{token.tag_}:{'*' if token.is_stop else '_'}")
-        tokens.append('<END>')
-        result.append(tokens)
+def lexeme(text: str, tag: str, stop: bool, structured: bool = False) -> Union[str, Token]:
+    if structured:
+        return Token(sys.intern(text.lower()), sys.intern(tag), stop)
+    return f"{text.lower()}:{tag}:{'*' if stop else '_'}"
+
+
+def frame(words: Iterable[Union[str, Token]], structured: bool = False) -> Sentence:
+    return [Token('<START>') if structured else '<START>', *words, Token('<END>') if structured else '<END>']
+
+
+def tokenize(doc, structured: bool = False) -> List[Sentence]:
+    result = [frame((lexeme(str(token), token.tag_, token.is_stop, structured) for token in sent if not token.is_punct),
+                    structured) for sent in doc.sents]
+    if METRICS.enabled:
+        METRICS.count(sentences=len(result), tokens=sum(len(tokens) - 2 for tokens in result))
 
     return result
 
 
-def encode(sentences: List[Sentence]) -> Tuple[Graph, Table]:
-    def overlap(left: str, elem: str, right: str) -> float:
-        return sum(0.5 for s, e in [(left, elem), (elem, right)]
-                   if any(k.startswith(s) and any(v.startswith(e) for v in vv) for k, vv in graph.items()))
+@measured('parse')
+def parse(content: str, structured: bool = False) -> List[Sentence]:
+    return tokenize(NLP(re.sub(r'\s+', ' ', content).strip()), structured)
+
+
+def parse_many(contents: Iterable[str], batch_size: int = 64, n_process: int = 1,
+               structured: bool = False) -> Iterator[List[Sentence]]:
+    texts = (re.sub(r'\s+', ' ', content).strip() for content in contents)
+    docs = iter(NLP.pipe(texts, batch_size=batch_size, n_process=n_process))
+    while True:
+        try:
+            with Timer('parse_many', verbose=False, metrics=METRICS):
+                sentences = tokenize(next(docs), structured)
+        except StopIteration:
+            return
+        yield sentences
+
+
+def shingles(sentence: Sentence, size: int = 2) -> Set[int]:
+    words = [str(token) for token in sentence[1:-1]]
+    return {zlib.crc32(' '.join(words[pos:pos + size]).encode('utf-8'))
+            for pos in range(max(len(words) - size + 1, 1))}
 
-    def occurs(elem: str) -> int:
-        return 0 if elem not in table else len(table[elem])
 
-    graph, table = {}, {}
-    ident = itertools.count()
+def dedupe(sentences: List[Sentence], threshold: float = 0.8, num_perm: int = 64, bands: int = 16,
+           size: int = 2, seed: int = 0) -> Tuple[List[Sentence], List[List[int]]]:
+    if num_perm % bands:
+        raise ValueError(f"Expected bands ({bands}) to divide num_perm ({num_perm})")
+
+    # an immediate repeat (or a token the duplication rule applies to) gives a word several nodes, which encode picks
+    # among by counts that depend on the order sentences arrive in: sentences using such words are never collapsed,
+    # so every other word has a single node and encoding the exact groups rebuilds the graph of the whole cluster
+    ambiguous = {str(token) for sentence in sentences for token, succ in zip(sentence[1:-1], sentence[2:-1])
+                 if str(token) == str(succ)}
+    ambiguous.update(str(token) for sentence in sentences for token in sentence[1:-1] if ':*:' in str(token))
+    exact = {}
     for idx, sentence in enumerate(sentences):
-        pred = sentence[0]
-        for pos, (curr, succ) in enumerate(zip(sentence[1:-1], sentence[2:-1])):
-            candidates = [(k, overlap(pred, curr, succ), occurs(k)) for k in graph if k.startswith(curr)]
-            if not candidates:
-                candidate = f"{curr}:{next(ident)}"
-            else:
-                candidate, score, num = max(candidates, key=lambda x: (x[1], x[2], x[0]))
-                if ':*:' in curr and score == 0:
-                    candidate = f"{curr}:{next(ident)}"
-            pool = graph.setdefault(pred, {})
-            pool[candidate] = pool.get(candidate, 0) + 1
-            table.setdefault(candidate, set()).add((idx, pos))
-            pred = candidate
-        pool = graph.setdefault(pred, {})
-        pool[sentence[-1]] = pool.get(sentence[-1], 0) + 1
+        words = tuple(str(token) for token in sentence)
+        exact.setdefault(words if ambiguous.isdisjoint(words) else idx, []).append(idx)
+    groups, pinned = list(exact.values()), {k for k, key in enumerate(exact) if isinstance(key, int)}
+    if threshold >= 1 or len(groups) - len(pinned) < 2:
+        return [sentences[members[0]] for members in groups], groups
+
+    # minhash signatures only propose candidates through banded buckets, the exact jaccard decides
+    rng, rows = random.Random(seed), num_perm // bands
+    seeds = [(rng.randrange(1, MERSENNE), rng.randrange(MERSENNE)) for _ in range(num_perm)]
+    buckets, merged, grams = {}, {}, []
+    for k, members in enumerate(groups):
+        if k in pinned:
+            grams.append(set())
+            merged[k] = list(members)
+            continue
+        grams.append(shingles(sentences[members[0]], size))
+        signature = [min((a * h + b) % MERSENNE for h in grams[k]) for a, b in seeds]
+        keys = [(band, *signature[band * rows:(band + 1) * rows]) for band in range(bands)]
+        candidates = dict.fromkeys(other for key in keys for other in buckets.get(key, ()))
+        scores = {other: len(grams[k] & grams[other]) / len(grams[k] | grams[other]) for other in candidates}
+        match = max(scores, key=lambda x: (scores[x], -x), default=None)
+        if match is not None and scores[match] >= threshold:
+            merged[match].extend(members)
+        else:
+            merged[k] = list(members)
+            for key in keys:
+                buckets.setdefault(key, []).append(k)
+
+    return [sentences[groups[k][0]] for k in merged], [sorted(members) for members in merged.values()]
+
+
+def parse_conll(lines: Iterable[str], structured: bool = False) -> Iterator[List[Sentence]]:
+    from spacy.lang.en.stop_words import STOP_WORDS
+    from spacy.lang.lex_attrs import is_punct
+
+    # CoNLL-U: one token per line (ID, FORM, LEMMA, UPOS, XPOS, ...), blank lines end sentences, '# newdoc' clusters
+    cluster, words = [], []
+    for line in itertools.chain(lines, ['']):
+        line = line.rstrip('\n')
+        if not line.strip() or line.startswith('# newdoc'):
+            if words:
+                cluster.append(frame(words, structured))
+                words = []
+            if line.startswith('# newdoc') and cluster:
+                yield cluster
+                cluster = []
+        elif not line.startswith('#'):
+            fields = line.split('\t')
+            if len(fields) < 5 or not fields[0].isdigit() or is_punct(fields[1]):
+                continue  # multiword ranges (1-2) and empty nodes (1.1) repeat the words they cover
+            words.append(lexeme(fields[1], fields[4] if fields[4] != '_' else fields[3],
+                                fields[1].lower() in STOP_WORDS, structured))
+    if cluster:
+        yield cluster
+
+
+def parse_docbin(data: bytes, structured: bool = False) -> Iterator[List[Sentence]]:
+    import spacy
+    from spacy.tokens import DocBin
+
+    # the DocBin has to store TAG and the sentence boundaries, either as SENT_START or through HEAD and DEP,
+    # e.g. DocBin(attrs=['ORTH', 'TAG', 'SENT_START']) as spaCy 2 leaves SENT_START out by default
+    vocab = spacy.blank('en').vocab
+    for doc in DocBin().from_bytes(data).get_docs(vocab):
+        yield tokenize(doc, structured)
+
+
+class WordGraph(object):
+    def __init__(self):
+        self.graph, self.table, self.groups = {}, {}, {}
+        self.nodes, self.succs, self.preds, self.pairs = {}, {}, {}, set()
+        self.order, self.ident, self.size = {}, itertools.count(), 0
+        self.tokens, self.surfaces = {}, {}
+        self.weights = {'naive': {}, 'advanced': {}}
+        self.stale = {'naive': set(), 'advanced': set()}
+
+    def token(self, item: Union[str, Token]) -> Tuple[str, bool]:
+        known = self.tokens.get(item)
+        if known is None:
+            text = sys.intern(item if isinstance(item, str) else str(item))
+            # the duplication rule has always tested ':*:', which no well-formed 'word:TAG:*' token contains
+            known = self.tokens[item] = (text, ':*:' in text)
+        return known
+
+    def create(self, item: Union[str, Token], fresh: bool = True) -> str:
+        text = self.token(item)[0]
+        node = f"{text}:{next(self.ident)}" if fresh else text
+        self.surfaces[node] = text
+        return node
 
-    return graph, table
+    def overlap(self, left: str, elem: str, right: str) -> float:
+        before = any(k.startswith(left) and elem in self.succs[k] for k in self.nodes.get(self.surfaces[left], []))
+        after = (elem, right) in self.pairs
+        return 0.5 * before + 0.5 * after
 
+    def occurs(self, elem: str) -> int:
+        return 0 if elem not in self.table else len(self.table[elem])
 
+    def link(self, tail: str, head: str, count: int = 1) -> None:
+        tail_text, head_text = self.surfaces[tail], self.surfaces[head]
+        if tail not in self.graph:
+            self.graph[tail], self.succs[tail], self.order[tail] = {}, set(), len(self.order)
+            self.nodes.setdefault(tail_text, []).append(tail)
+        pool = self.graph[tail]
+        pool[head] = pool.get(head, 0) + count
+        self.succs[tail].add(head_text)
+        self.preds.setdefault(head, set()).add(tail)
+        self.pairs.add((tail_text, head_text))
+        for stale in self.stale.values():
+            stale.add(tail)
+
+    def refer(self, node: str, idx: int, pos: int) -> None:
+        self.table.setdefault(node, set()).add((idx, pos))
+        self.groups.setdefault(node, {}).setdefault(idx, []).append(pos)
+        self.stale['advanced'].add(node)
+
+    def add_sentences(self, sentences: List[Sentence], members: Optional[List[List[int]]] = None) -> 'WordGraph':
+        scored, base = 0, self.size
+        members = [[idx] for idx in range(len(sentences))] if members is None else members
+        for sentence, group in zip(sentences, members):
+            pred, weight = self.create(sentence[0], fresh=False), len(group)
+            for pos, (curr, succ) in enumerate(zip(sentence[1:-1], sentence[2:-1])):
+                text, duplicable = self.token(curr)
+                candidates = self.nodes.get(text, [])
+                scored += len(candidates)
+                if not candidates:
+                    candidate = self.create(curr)
+                else:
+                    candidate = max(candidates, key=lambda x: (self.occurs(x), x))
+                    if duplicable and self.overlap(pred, text, self.token(succ)[0]) == 0:
+                        candidate = self.create(curr)
+                self.link(pred, candidate, weight)
+                for member in group:
+                    self.refer(candidate, base + member, pos)
+                pred = candidate
+            self.link(pred, self.create(sentence[-1], fresh=False), weight)
+            self.size = max(self.size, base + group[-1] + 1)
+        if METRICS.enabled:
+            METRICS.count(sentences=len(sentences), tokens=sum(len(s) - 2 for s in sentences), candidates=scored)
+
+        return self
+
+    def weigh(self, weighting: str = 'advanced') -> Graph:
+        result, stale = self.weights[weighting], self.stale[weighting]
+        if weighting == 'advanced':
+            stale.update([tail for node in stale for tail in self.preds.get(node, ())])
+        tails = sorted((tail for tail in stale if tail in self.graph), key=self.order.get)
+        rows = {tail: self.graph[tail] for tail in tails}
+        result.update(naive_weight(rows) if weighting == 'naive' else advanced_weight(rows, self.table, self.groups))
+        stale.clear()
+
+        return result
+
+    def traverse(self, weighting: str = 'advanced', num_results: int = 5,
+                 min_len: int = 8) -> List[Tuple[List[str], float]]:
+        return traverse(self.weigh(weighting), num_results, min_len)
+
+
+@measured('encode')
+def encode(sentences: List[Sentence], members: Optional[List[List[int]]] = None) -> Tuple[Graph, Table]:
+    words = WordGraph().add_sentences(sentences, members)
+    return words.graph, words.table
+
+
+@measured('naive_weight')
 def naive_weight(graph: Graph) -> Graph:
+    return {tail: naive_row(heads) for tail, heads in graph.items()}
+
+
+def naive_row(heads: Dict[str, int]) -> Dict[str, float]:
+    total = sum(heads.values())
+    # return {head: total / occur for head, occur in heads.items()}
+    return {head: 1 - occur / total for head, occur in heads.items()}
+
+
+def group(lookup: Table) -> Groups:
     result = {}
-    for tail, heads in graph.items():
-        total = sum(heads.values())
-        result[tail] = {}
-        for head, occur in heads.items():
-            # result[tail][head] = total / occur
-            result[tail][head] = 1 - occur / total
+    for node, refs in lookup.items():
+        groups = result.setdefault(node, {})
+        for idx, pos in sorted(refs):
+            groups.setdefault(idx, []).append(pos)
 
     return result
 
 
-def advanced_weight(graph: Graph, lookup: Table) -> Graph:
+def proximity(tail_groups: Dict[int, List[int]], head_groups: Dict[int, List[int]]) -> float:
+    strength = 0
+    smaller, larger = sorted((tail_groups, head_groups), key=len)
+    for idx in (idx for idx in smaller if idx in larger):
+        tail_positions = tail_groups[idx]
+        for head_pos in head_groups[idx]:
+            for tail_pos in tail_positions:
+                if tail_pos >= head_pos:
+                    break
+                strength += 1 / (tail_pos - head_pos)
+
+    return strength
+
+
+@measured('advanced_weight')
+def advanced_weight(graph: Graph, lookup: Table, groups: Optional[Groups] = None) -> Graph:
+    groups = group(lookup) if groups is None else groups
+    return {tail: advanced_row(tail, heads, lookup, groups) for tail, heads in graph.items()}
+
+
+def advanced_row(tail: str, heads: Dict[str, int], lookup: Table, groups: Groups) -> Dict[str, float]:
     result = {}
-    for tail, heads in graph.items():
-        result[tail] = {}
-        for head, occur in heads.items():
-            tail_refs = lookup.get(tail, set())
-            head_refs = lookup.get(head, set())
-            strength = 0
-            for tail_ref in tail_refs:
-                for head_ref in head_refs:
-                    if tail_ref[0] == head_ref[0] and tail_ref[1] < head_ref[1]:
-                        strength += 1 / (tail_ref[1] - head_ref[1])
-            if strength:
-                strength = (len(tail_refs) + len(head_refs)) / strength
-            salience = 0 if strength == 0 else strength / (len(tail_refs) * len(head_refs))
-            result[tail][head] = 1 - salience
+    tail_count = len(lookup.get(tail, ()))
+    for head, occur in heads.items():
+        head_count = len(lookup.get(head, ()))
+        strength = proximity(groups.get(tail, {}), groups.get(head, {}))
+        if strength:
+            strength = (tail_count + head_count) / strength
+        salience = 0 if strength == 0 else strength / (tail_count * head_count)
+        result[head] = 1 - salience
 
     return result
 
 
-def traverse(graph: Graph, num_results: int = 5, min_len: int = 8) -> List[Tuple[List[str], float]]:
-    result, fringe = [], [([], 0)]
-    while num_results > 0 and fringe:
-        best = min(fringe, key=lambda x: x[1])
-        fringe.remove(best)
-        tail = best[0][-1] if best[0] else '<START>'
-        if tail not in graph:
+class LazyWeights(dict):
+    # naive costs lie in [0, 1) and advanced ones never drop below 1, since proximity only sums negative terms
+    FLOORS = {'naive': 0.0, 'advanced': 1.0}
+
+    def __init__(self, graph: Graph, lookup: Optional[Table] = None, weighting: str = 'advanced'):
+        super().__init__()
+        if weighting not in self.FLOORS:
+            raise ValueError(f"Unknown weighting: {weighting}")
+        self.graph, self.lookup, self.weighting, self.groups = graph, lookup or {}, weighting, {}
+
+    @property
+    def floor(self) -> float:
+        return self.FLOORS[self.weighting]
+
+    def __missing__(self, tail: str) -> Dict[str, float]:
+        heads = self.graph[tail]
+        if self.weighting == 'naive':
+            row = self[tail] = naive_row(heads)
+            return row
+
+        for node in (tail, *heads):
+            if node not in self.groups and node in self.lookup:
+                self.groups.update(group({node: self.lookup[node]}))
+        row = self[tail] = advanced_row(tail, heads, self.lookup, self.groups)
+        return row
+
+
+def weigh(graph: Graph, lookup: Table, weighting: str = 'advanced', lazy: bool = False) -> Graph:
+    if lazy:
+        return LazyWeights(graph, lookup, weighting)
+    if weighting == 'naive':
+        return naive_weight(graph)
+    if weighting == 'advanced':
+        return advanced_weight(graph, lookup)
+
+    raise ValueError(f"Unknown weighting: {weighting}")
+
+
+class Verbs(dict):
+    def __init__(self, verb: Callable[[str], bool] = lambda node: Token.node(node).verb):
+        super().__init__()
+        self.verb = verb
+
+    def __missing__(self, node: str) -> bool:
+        verb = self[node] = self.verb(node)
+        return verb
+
+
+class Bits(dict):
+    def __missing__(self, node: str) -> int:
+        bit = self[node] = 1 << len(self) % 64
+        return bit
+
+
+Path = Optional[Tuple[str, 'Path']]
+
+
+def unwind(path: Path) -> List[str]:
+    nodes = []
+    while path is not None:
+        node, path = path
+        nodes.append(node)
+    nodes.reverse()
+
+    return nodes
+
+
+def visits(path: Path, node: str) -> bool:
+    while path is not None:
+        if path[0] == node:
+            return True
+        path = path[1]
+
+    return False
+
+
+class Adjacency(object):
+    # how the search reads a weighted graph: rows of (head, weight) pairs keyed by whatever ids the graph uses
+    def __init__(self, graph: Graph):
+        self.graph, self.start, self.end, self.floors = graph, '<START>', '<END>', None
+        self.shape = graph.graph if isinstance(graph, LazyWeights) else graph  # lazy weights are computed on expansion
+
+    def nodes(self) -> Set[str]:
+        return {self.start, *self.shape, *(head for heads in self.shape.values() for head in heads)} - {self.end}
+
+    def live(self, node: str) -> bool:
+        return bool(self.shape.get(node))
+
+    def row(self, node: str) -> Collection[Tuple[str, float]]:
+        return self.graph[node].items() if node in self.shape else ()
+
+    def rows(self) -> Iterable[Tuple[str, Iterable[Tuple[str, float]]]]:
+        # the non-negative lower bounds of the weights, which lazy weights only know through their floor
+        if self.floors is None:
+            if isinstance(self.graph, LazyWeights):
+                floor = self.graph.floor
+                self.floors = [(tail, [(head, floor) for head in heads]) for tail, heads in self.shape.items()]
+            else:
+                self.floors = [(tail, [(head, max(weight, 0)) for head, weight in heads.items()])
+                               for tail, heads in self.graph.items()]
+        return self.floors
+
+    def admissible(self) -> bool:
+        # lazy weights are never negative, see LazyWeights.FLOORS
+        if isinstance(self.graph, LazyWeights):
+            return True
+        return all(weight >= 0 for heads in self.graph.values() for weight in heads.values())
+
+    def verb(self, node: str) -> bool:
+        return Token.node(node).verb
+
+    def labels(self, nodes: List[str]) -> List[str]:
+        return nodes
+
+
+def view(graph: Union[Graph, Adjacency]) -> Adjacency:
+    return graph if isinstance(graph, Adjacency) else Adjacency(graph)
+
+
+class Bounds(NamedTuple):
+    length: List[Dict[str, float]]
+    verb: Dict[str, float]
+    admissible: bool
+
+
+def bound(graph: Union[Graph, Adjacency], min_len: int = 8) -> Bounds:
+    adjacency = view(graph)
+    nodes, end = adjacency.nodes(), adjacency.end
+    length = [dict.fromkeys(nodes, 0.0)]
+    for _ in range(min_len):
+        last, layer = length[-1], dict.fromkeys(nodes, math.inf)
+        for tail, heads in adjacency.rows():
+            layer[tail] = min((weight + last[head] for head, weight in heads if head != end), default=math.inf)
+        length.append(layer)
+
+    preds = {}
+    for tail, heads in adjacency.rows():
+        for head, weight in heads:
+            if head != end:
+                preds.setdefault(head, []).append((tail, weight))
+    verb = {node: 0.0 for node in nodes if adjacency.verb(node)}
+    fringe = [(0.0, node) for node in verb]
+    while fringe:
+        dist, head = heapq.heappop(fringe)
+        if dist > verb[head]:
             continue
+        for tail, weight in preds.get(head, []):
+            if dist + weight < verb.get(tail, math.inf):
+                verb[tail] = dist + weight
+                heapq.heappush(fringe, (dist + weight, tail))
 
-        for head, cost in graph[tail].items():
-            if head in best[0]:
-                continue
+    return Bounds(length, verb, adjacency.admissible())
+
+
+class Frontier(object):
+    # with non-negative weights, keys (cost, parent key, index) replay the pop order of a plain best-first search
+    # with ties broken by insertion, so putting cost + estimate in front only changes which dead ends get expanded
+    # paths are parent-linked (node, parent) pairs and each state also carries its length, whether it has a verb
+    # and a 64-bit filter of its nodes, so pushing is O(1) and only filter hits walk the path to rule out cycles
+    def __init__(self, adjacency: Adjacency, bounds: Bounds, min_len: int = 8):
+        self.adjacency, self.bounds, self.min_len = adjacency, bounds, min_len
+        self.horizon = len(bounds.length) - 1
+        self.verbs, self.bits, self.counter = Verbs(adjacency.verb), Bits(), itertools.count(1)
+        self.fringe = [(0, (0,), 0, False, 0, None)] if self.estimate(adjacency.start, 0, False) < math.inf else []
+        self.expanded, self.pruned, self.peak = 0, 0, len(self.fringe)
+
+    def estimate(self, node: str, size: int, verb: bool) -> float:
+        if not self.adjacency.live(node):
+            return math.inf
+        remaining = self.bounds.length[min(max(self.min_len - size, 0), self.horizon)].get(node, math.inf)
+        return remaining if verb else max(remaining, self.bounds.verb.get(node, math.inf))
 
-            if head != '<END>':
-                path = ([*best[0], head], best[1] + cost)
-                if path not in fringe:
-                    fringe.append(path)
+    def spent(self, budget: Optional[int], deadline: Optional[float]) -> bool:
+        if budget is not None and self.expanded >= budget:
+            return True
+        return deadline is not None and self.expanded % 64 == 0 and time.perf_counter() > deadline
 
-            if len(best[0]) < min_len or not any(':VB' in n for n in best[0]):
+    def pop(self) -> Tuple:
+        self.peak = max(self.peak, len(self.fringe))
+        return heapq.heappop(self.fringe)
+
+    def expand(self, state: Tuple) -> List[Tuple[int, str, float]]:
+        seen, path, bits = state[4], state[5], self.bits
+        options = self.adjacency.row(self.adjacency.start if path is None else path[0])
+        heads = [(idx, head, weight) for idx, (head, weight) in enumerate(options)
+                 if not bits[head] & seen or not visits(path, head)]
+        self.expanded, self.pruned = self.expanded + 1, self.pruned + len(options) - len(heads)
+        return heads
+
+    def push(self, state: Tuple, heads: List[Tuple[int, str, float]]) -> None:
+        _, key, size, verb, seen, path = state
+        cost, admissible, end = key[0], self.bounds.admissible, self.adjacency.end
+        for idx, head, weight in heads:
+            if head == end:
                 continue
+            extended = verb or self.verbs[head]
+            remaining = self.estimate(head, size + 1, extended)
+            if remaining == math.inf:
+                self.pruned += 1
+                continue
+            if admissible:
+                remaining = max(remaining - 1e-9 * (1 + cost + remaining), 0)  # absorbs rounding in the estimates
+                score, order = cost + weight + remaining, (cost + weight, key, idx)
+            else:
+                score, order = cost + weight, (cost + weight, next(self.counter))
+            heapq.heappush(self.fringe, (score, order, size + 1, extended, seen | self.bits[head], (head, path)))
 
-            entry = (best[0], best[1] / len(best[0]))
-            if entry not in result:
-                result.append(entry)
-            if len(result) >= num_results:
-                return result
+    def record(self, stats: Dict[str, int]) -> None:
+        stats.update(expanded=self.expanded, pruned=self.pruned, peak_fringe=self.peak, exhausted=not self.fringe)
 
-    return result
+
+def explore(graph: Union[Graph, Adjacency], min_len: int = 8, timeout: Optional[float] = None,
+            budget: Optional[int] = None, bounds: Optional[Bounds] = None,
+            stats: Optional[Dict[str, int]] = None) -> Iterator[Tuple[List[str], float]]:
+    adjacency = view(graph)
+    frontier = Frontier(adjacency, bound(adjacency, min_len) if bounds is None else bounds, min_len)
+    stats = {} if stats is None else stats
+    deadline = None if timeout is None else time.perf_counter() + timeout
+    while frontier.fringe and not frontier.spent(budget, deadline):
+        state = frontier.pop()
+        heads = frontier.expand(state)
+        frontier.push(state, heads)
+        _, key, size, verb, _, path = state
+        if heads and size >= min_len and verb:
+            frontier.record(stats)
+            yield adjacency.labels(unwind(path)), key[0] / size
+    frontier.record(stats)
+
+
+@measured('traverse')
+def search(graph: Union[Graph, Adjacency], num_results: int = 5, min_len: int = 8, timeout: Optional[float] = None,
+           budget: Optional[int] = None, bounds: Optional[Bounds] = None) -> Tuple[List[Tuple[List[str], float]], bool]:
+    stats = {}
+    result = list(itertools.islice(explore(graph, min_len, timeout, budget, bounds, stats), max(num_results, 0)))
+    complete = len(result) >= num_results or stats['exhausted']
+    if METRICS.enabled:
+        METRICS.count(expanded=stats.get('expanded', 0), pruned=stats.get('pruned', 0),
+                      peak_fringe=stats.get('peak_fringe', 0), results=len(result), truncated=not complete)
+
+    return result, complete
+
+
+def traverse(graph: Graph, num_results: int = 5, min_len: int = 8) -> List[Tuple[List[str], float]]:
+    return search(graph, num_results, min_len)[0]
+
+
+class Compressor(object):
+    def __init__(self, graph: Graph, lookup: Table, lazy: bool = False):
+        self.graph, self.lookup, self.lazy = graph, lookup, lazy
+        self.weights, self.bounds, self.streams = {}, {}, {}
+
+    def weigh(self, weighting: str = 'advanced') -> Graph:
+        if weighting not in self.weights:
+            self.weights[weighting] = weigh(self.graph, self.lookup, weighting, self.lazy)
+
+        return self.weights[weighting]
+
+    def bound(self, weighting: str = 'advanced', min_len: int = 8) -> Bounds:
+        # the layers of a bound for a longer min_len extend those of a shorter one, so the widest serves every query
+        bounds = self.bounds.get(weighting)
+        if bounds is None or len(bounds.length) <= min_len:
+            bounds = self.bounds[weighting] = bound(self.weigh(weighting), min_len)
+
+        return bounds
+
+    def query(self, weighting: str = 'advanced', num_results: int = 5,
+              min_len: int = 8) -> List[Tuple[List[str], float]]:
+        if (weighting, min_len) not in self.streams:
+            stats = {}
+            found = explore(self.weigh(weighting), min_len, bounds=self.bound(weighting, min_len), stats=stats)
+            self.streams[weighting, min_len] = (found, stats, [])
+        found, _, results = self.streams[weighting, min_len]
+        results.extend(itertools.islice(found, max(num_results - len(results), 0)))
+
+        return [(list(path), cost) for path, cost in results[:max(num_results, 0)]]
+
+    def answer(self, queries: Iterable[Tuple[str, int, int]]) -> List[List[Tuple[List[str], float]]]:
+        queries = list(queries)
+        for weighting, _, min_len in sorted(queries, key=lambda x: -x[2]):
+            self.bound(weighting, min_len)
+
+        return [self.query(weighting, num_results, min_len) for weighting, num_results, min_len in queries]
+
+
+def summarise(sentences: List[Sentence], weighting: str = 'advanced', num_results: int = 5, min_len: int = 8,
+              timeout: Optional[float] = None, budget: Optional[int] = None, threshold: Optional[float] = None,
+              lazy: bool = False) -> Tuple[List[Tuple[List[str], float]], bool]:
+    graph, table = encode(sentences) if threshold is None else encode(*dedupe(sentences, threshold))
+    return search(weigh(graph, table, weighting, lazy), num_results, min_len, timeout, budget)
+
+
+def condense(sentences: List[Sentence], weighting: str = 'advanced', num_results: int = 5, min_len: int = 8,
+             timeout: Optional[float] = None, budget: Optional[int] = None,
+             threshold: Optional[float] = None, lazy: bool = False) -> List[Tuple[List[str], float]]:
+    return summarise(sentences, weighting, num_results, min_len, timeout, budget, threshold, lazy)[0]
+
+
+def compress(content: str, weighting: str = 'advanced', num_results: int = 5, min_len: int = 8,
+             timeout: Optional[float] = None, budget: Optional[int] = None,
+             threshold: Optional[float] = None, lazy: bool = False) -> List[Tuple[List[str], float]]:
+    return condense(parse(content), weighting, num_results, min_len, timeout, budget, threshold, lazy)
+
+
+def render(summary: Sentence) -> str:
+    return ' '.join(Token.node(k).word for k in summary)
 
 
-def report(summaries: List[Tuple[Sentence, float]], num_results: int = 5) -> None:
-    summaries = sorted(summaries, key=lambda x: x[1])
+def report(summaries: Iterable[Tuple[Sentence, float]], num_results: int = 5, output: Optional[TextIO] = None,
+           structured: bool = False, ranked: bool = True) -> None:
+    output = sys.stdout if output is None else output
+    summaries = sorted(summaries, key=lambda x: x[1]) if ranked else summaries
     for idx, (summary, cost) in enumerate(summaries, start=1):
-        print(f"      {idx:3}. (cost: {cost:.3f}) {' '.join(k.split(':')[0] for k in summary)}")
+        if structured:
+            output.write(json.dumps({'rank': idx, 'summary': render(summary), 'cost': cost, 'tokens': summary}) + '\n')
+        else:
+            output.write(f"      {idx:3}. (cost: {cost:.3f}) {render(summary)}\n")
+        output.flush()
         if idx > 0 and idx == num_results:
             break
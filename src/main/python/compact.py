@@ -0,0 +1,294 @@
+import itertools
+import sys
+from array import array
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+from typing import Union
+
+from code import Adjacency
+from code import Graph
+from code import Sentence
+from code import Table
+from code import Token
+from code import proximity
+from code import search as search_dict
+
+
+class CompactGraph(object):
+    def __init__(self, names: List[str], size: int, offsets: array, targets: array, counts: Optional[array],
+                 weights: Optional[array], postings: array, sentences: array, positions: array):
+        self.names = names
+        self.size = size
+        self.offsets = offsets
+        self.targets = targets
+        self.counts = counts
+        self.weights = weights
+        self.postings = postings
+        self.sentences = sentences
+        self.positions = positions
+        self.index = None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def node(self, name: str) -> Optional[int]:
+        if self.index is None:
+            self.index = {name: idx for idx, name in enumerate(self.names)}
+
+        return self.index.get(name)
+
+    def edges(self, node: int) -> range:
+        return range(self.offsets[node], self.offsets[node + 1])
+
+    def refs(self, node: int) -> range:
+        return range(self.postings[node], self.postings[node + 1])
+
+    def weighted(self, weights: array) -> 'CompactGraph':
+        result = CompactGraph(self.names, self.size, self.offsets, self.targets, self.counts, weights,
+                              self.postings, self.sentences, self.positions)
+        result.index = self.index
+        return result
+
+    @classmethod
+    def from_dict(cls, graph: Graph, lookup: Optional[Table] = None, weighted: bool = False) -> 'CompactGraph':
+        lookup = lookup or {}
+        names = list(graph)
+        index = {name: idx for idx, name in enumerate(names)}
+        for name in itertools.chain((head for heads in graph.values() for head in heads), lookup):
+            if name not in index:
+                index[name] = len(names)
+                names.append(name)
+
+        offsets, targets, values = array('q', [0]), array('q'), array('d' if weighted else 'q')
+        postings, sentences, positions = array('q', [0]), array('q'), array('q')
+        for name in names:
+            for head, value in graph.get(name, {}).items():
+                targets.append(index[head])
+                values.append(value)
+            offsets.append(len(targets))
+            for sent, pos in lookup.get(name, ()):
+                sentences.append(sent)
+                positions.append(pos)
+            postings.append(len(sentences))
+
+        result = cls(names, len(graph), offsets, targets, None if weighted else values, values if weighted else None,
+                     postings, sentences, positions)
+        result.index = index
+        return result
+
+    def to_dict(self) -> Graph:
+        values = self.counts if self.weights is None else self.weights
+        return {self.names[tail]: {self.names[self.targets[e]]: values[e] for e in self.edges(tail)}
+                for tail in range(self.size)}
+
+    def to_table(self) -> Table:
+        return {self.names[node]: {(self.sentences[r], self.positions[r]) for r in self.refs(node)}
+                for node in range(len(self)) if self.postings[node] < self.postings[node + 1]}
+
+
+class Arrays(Adjacency):
+    # the search's view of a CompactGraph, reading rows straight off the CSR buffers with integer ids as nodes
+    def __init__(self, graph: CompactGraph):
+        self.graph, self.start, self.end, self.floors = graph, graph.node('<START>'), graph.node('<END>'), None
+
+    def nodes(self) -> Set[int]:
+        return set(range(len(self.graph))) - {self.end}
+
+    def live(self, node: Optional[int]) -> bool:
+        graph = self.graph
+        return node is not None and node < graph.size and graph.offsets[node] < graph.offsets[node + 1]
+
+    def row(self, node: int) -> List[Tuple[int, float]]:
+        graph = self.graph
+        if node is None or node >= graph.size:
+            return []
+        low, high = graph.offsets[node], graph.offsets[node + 1]
+        return list(zip(graph.targets[low:high], graph.weights[low:high]))
+
+    def rows(self) -> Iterator[Tuple[int, Iterator[Tuple[int, float]]]]:
+        graph = self.graph
+        if self.floors is None:
+            self.floors = array('d', (max(weight, 0) for weight in graph.weights))
+        offsets, targets, floors = graph.offsets, graph.targets, self.floors
+        return ((tail, zip(targets[offsets[tail]:offsets[tail + 1]], floors[offsets[tail]:offsets[tail + 1]]))
+                for tail in range(graph.size))
+
+    def admissible(self) -> bool:
+        return all(weight >= 0 for weight in self.graph.weights)
+
+    def verb(self, node: int) -> bool:
+        return Token.node(self.graph.names[node]).verb
+
+    def labels(self, nodes: List[int]) -> List[str]:
+        names = self.graph.names
+        return [names[node] for node in nodes]
+
+
+def pack(keys: array, values: List[array], size: int) -> Tuple[array, List[array]]:
+    # stable counting sort of parallel buffers by key, returning the offsets of each key's run
+    offsets = array('q', bytes(8 * (size + 1)))
+    for key in keys:
+        offsets[key + 1] += 1
+    for idx in range(size):
+        offsets[idx + 1] += offsets[idx]
+    cursor = array('q', offsets)
+    packed = [array(column.typecode, bytes(column.itemsize * len(keys))) for column in values]
+    for item, key in enumerate(keys):
+        slot, cursor[key] = cursor[key], cursor[key] + 1
+        for column, source in zip(packed, values):
+            column[slot] = source[item]
+
+    return offsets, packed
+
+
+class Encoder(object):
+    # replays the node choices of WordGraph.add_sentences on integer ids, writing edges and references into buffers
+    def __init__(self):
+        self.names, self.surfaces, self.occurs, self.ranks = [], [], array('q'), array('q')
+        self.nodes, self.fixed, self.tokens, self.ranked, self.ident = {}, {}, {}, [], itertools.count()
+        self.slots, self.tails, self.heads, self.counts = {}, array('q'), array('q'), array('q')
+        self.owners, self.refs, self.positions = array('q'), array('q'), array('q')
+
+    def token(self, item: Union[str, Token]) -> Tuple[str, bool]:
+        known = self.tokens.get(item)
+        if known is None:
+            text = sys.intern(item if isinstance(item, str) else str(item))
+            known = self.tokens[item] = (text, ':*:' in text)
+        return known
+
+    def create(self, item: Union[str, Token], fresh: bool = True) -> int:
+        text = self.token(item)[0]
+        if not fresh and text in self.fixed:
+            return self.fixed[text]
+        self.names.append(f"{text}:{next(self.ident)}" if fresh else text)
+        self.surfaces.append(text)
+        self.occurs.append(0)
+        self.ranks.append(-1)
+        if not fresh:
+            self.fixed[text] = len(self.names) - 1
+        return len(self.names) - 1
+
+    def overlap(self, left: int, elem: str, right: str) -> float:
+        # only tokens containing ':*:' get here, which well-formed ones never do, so scanning the edges is cheaper
+        # than the text-level indexes WordGraph keeps for it
+        names, surfaces, tails, heads = self.names, self.surfaces, self.tails, self.heads
+        before = any(names[k].startswith(names[left]) and
+                     any(tails[e] == k and surfaces[heads[e]] == elem for e in range(len(tails)))
+                     for k in self.nodes.get(surfaces[left], []))
+        after = any(surfaces[tails[e]] == elem and surfaces[heads[e]] == right for e in range(len(tails)))
+        return 0.5 * before + 0.5 * after
+
+    def choose(self, pred: int, curr: Union[str, Token], succ: Union[str, Token]) -> int:
+        text, duplicable = self.token(curr)
+        candidates = self.nodes.get(text)
+        if not candidates:
+            return self.create(curr)
+        occurs, names = self.occurs, self.names
+        candidate = max(candidates, key=lambda x: (occurs[x], names[x]))
+        if duplicable and self.overlap(pred, text, self.token(succ)[0]) == 0:
+            return self.create(curr)
+        return candidate
+
+    def link(self, tail: int, head: int, count: int) -> None:
+        if self.ranks[tail] < 0:
+            self.ranks[tail] = len(self.ranked)
+            self.ranked.append(tail)
+            self.nodes.setdefault(self.surfaces[tail], []).append(tail)
+        key = tail << 32 | head
+        edge = self.slots.get(key)
+        if edge is None:
+            edge = self.slots[key] = len(self.tails)
+            self.tails.append(tail)
+            self.heads.append(head)
+            self.counts.append(0)
+        self.counts[edge] += count
+
+    def add(self, sentence: Sentence, copies: List[int]) -> None:
+        owners, refs, positions, occurs = self.owners, self.refs, self.positions, self.occurs
+        pred, weight = self.create(sentence[0], fresh=False), len(copies)
+        for pos, (curr, succ) in enumerate(zip(sentence[1:-1], sentence[2:-1])):
+            candidate = self.choose(pred, curr, succ)
+            self.link(pred, candidate, weight)
+            for member in copies:
+                owners.append(candidate)
+                refs.append(member)
+                positions.append(pos)
+            occurs[candidate] += weight
+            pred = candidate
+        self.link(pred, self.create(sentence[-1], fresh=False), weight)
+
+    def pack(self) -> CompactGraph:
+        # tails come first in the order they were linked, as in the dict graph, then every other node
+        size = len(self.names)
+        order = self.ranked + [node for node in range(size) if self.ranks[node] < 0]
+        renumber = array('q', bytes(8 * size))
+        for new, old in enumerate(order):
+            renumber[old] = new
+        offsets, (targets, values) = pack(array('q', (renumber[tail] for tail in self.tails)),
+                                          [array('q', (renumber[head] for head in self.heads)), self.counts], size)
+        self.slots, self.tails, self.heads, self.counts = {}, array('q'), array('q'), array('q')  # edges are packed
+        postings, (sents, places) = pack(array('q', (renumber[owner] for owner in self.owners)),
+                                         [self.refs, self.positions], size)
+
+        return CompactGraph([self.names[old] for old in order], len(self.ranked), offsets, targets, values, None,
+                            postings, sents, places)
+
+
+def encode(sentences: List[Sentence], members: Optional[List[List[int]]] = None) -> CompactGraph:
+    encoder = Encoder()
+    members = [[idx] for idx in range(len(sentences))] if members is None else members
+    for sentence, copies in zip(sentences, members):
+        encoder.add(sentence, copies)
+
+    return encoder.pack()
+
+
+def group(graph: CompactGraph) -> List[Dict[int, List[int]]]:
+    result = []
+    for node in range(len(graph)):
+        groups = {}
+        for r in sorted(graph.refs(node), key=lambda x: (graph.sentences[x], graph.positions[x])):
+            groups.setdefault(graph.sentences[r], []).append(graph.positions[r])
+        result.append(groups)
+
+    return result
+
+
+def naive_weight(graph: CompactGraph) -> CompactGraph:
+    weights = array('d')
+    for tail in range(len(graph)):
+        edges = graph.edges(tail)
+        total = sum(graph.counts[e] for e in edges)
+        weights.extend(1 - graph.counts[e] / total for e in edges)
+
+    return graph.weighted(weights)
+
+
+def advanced_weight(graph: CompactGraph) -> CompactGraph:
+    groups = group(graph)
+    weights = array('d')
+    for tail in range(len(graph)):
+        tail_count = len(graph.refs(tail))
+        for e in graph.edges(tail):
+            head = graph.targets[e]
+            head_count = len(graph.refs(head))
+            strength = proximity(groups[tail], groups[head])
+            if strength:
+                strength = (tail_count + head_count) / strength
+            salience = 0 if strength == 0 else strength / (tail_count * head_count)
+            weights.append(1 - salience)
+
+    return graph.weighted(weights)
+
+
+def search(graph: CompactGraph, num_results: int = 5, min_len: int = 8, timeout: Optional[float] = None,
+           budget: Optional[int] = None) -> Tuple[List[Tuple[List[str], float]], bool]:
+    return search_dict(Arrays(graph), num_results, min_len, timeout, budget)
+
+
+def traverse(graph: CompactGraph, num_results: int = 5, min_len: int = 8) -> List[Tuple[List[str], float]]:
+    return search(graph, num_results, min_len)[0]
@@ -0,0 +1,137 @@
+import itertools
+import os
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Deque
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+from cache import ResultCache
+from code import Sentence
+from code import parse
+from code import summarise
+from utils import NLP
+
+CACHE = None
+
+
+class Outcome(NamedTuple):
+    summaries: List[Tuple[List[str], float]]
+    error: Optional[str] = None
+    complete: bool = True
+
+
+def setup(name: str, disable: Tuple[str, ...], cache: Optional[str] = None, ttl: Optional[float] = None,
+          fast: bool = False, preload: bool = True) -> None:
+    global CACHE
+    NLP.configure(name, disable, fast)
+    if preload:
+        NLP.load()
+    CACHE = None if cache is None else ResultCache(ttl=ttl, path=cache)
+
+
+def attempt(content: Union[str, List[Sentence]], weighting: str, num_results: int, min_len: int,
+            timeout: Optional[float]) -> Outcome:
+    try:
+        # the timeout is the anytime deadline of the search, which keeps the best summaries found by then
+        if CACHE is not None and isinstance(content, str):
+            summaries, complete = CACHE.summarise(content, weighting, num_results, min_len, timeout)
+        else:  # content may be already parsed, e.g. read from CoNLL or a DocBin
+            sentences = parse(content) if isinstance(content, str) else content
+            summaries, complete = summarise(sentences, weighting, num_results, min_len, timeout)
+    except Exception as e:
+        return Outcome([], f"{type(e).__name__}: {e}", False)
+
+    return Outcome(summaries, complete=complete)
+
+
+def work(chunk: List[str], weighting: str, num_results: int, min_len: int, timeout: Optional[float]) -> List[Outcome]:
+    return [attempt(content, weighting, num_results, min_len, timeout) for content in chunk]
+
+
+class Engine(object):
+    def __init__(self, workers: Optional[int] = None, chunk_size: int = 16, timeout: Optional[float] = None,
+                 weighting: str = 'advanced', num_results: int = 5, min_len: int = 8, cache: Optional[str] = None,
+                 ttl: Optional[float] = None, preload: bool = True, limit: Optional[float] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.weighting = weighting
+        self.num_results = num_results
+        self.min_len = min_len
+        self.cache = cache
+        self.ttl = ttl
+        self.preload = preload
+        self.limit = limit
+        self.pool = None
+
+    def __enter__(self) -> 'Engine':
+        return self.start()
+
+    def __exit__(self, ty, val, tb):
+        self.close()
+
+        return False  # re-raise any exceptions
+
+    def start(self) -> 'Engine':
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.workers, initializer=setup, initargs=(
+                NLP.name, NLP.disable, self.cache, self.ttl, NLP.fast, self.preload))
+
+        return self
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def submit(self, chunk: List[str]) -> Tuple[List[str], ProcessPoolExecutor, Future]:
+        pool = self.start().pool
+        return chunk, pool, pool.submit(work, chunk, self.weighting, self.num_results, self.min_len, self.timeout)
+
+    def halt(self, pool: ProcessPoolExecutor) -> None:
+        # a worker stuck on a cluster cannot be interrupted, so its whole pool is terminated and replaced
+        for process in list((pool._processes or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=True)
+        if pool is self.pool:
+            self.pool = None
+
+    def collect(self, pending: Deque[Tuple[List[str], ProcessPoolExecutor, Future]]) -> List[Outcome]:
+        chunk, pool, future = pending.popleft()
+        try:
+            # the limit covers every stage of each cluster and runs from when its chunk is the oldest one pending
+            return future.result(None if self.limit is None else self.limit * len(chunk))
+        except TimeoutError:
+            self.halt(pool)
+            for idx, (waiting, owner, queued) in enumerate(pending):
+                if owner is pool and queued.done() and (queued.cancelled() or queued.exception() is not None):
+                    pending[idx] = self.submit(waiting)
+            if len(chunk) == 1:
+                return [Outcome([], f"TimeoutError: no result within {self.limit}s", False)]
+            # the clusters of the chunk are retried one by one, so only the stuck one fails
+            pending.extendleft(reversed([self.submit([content]) for content in chunk]))
+            return []
+        except BrokenProcessPool as e:
+            if pool is self.pool:
+                self.pool.shutdown(wait=False)
+                self.pool = None
+            return [Outcome([], f"{type(e).__name__}: {e}", False)] * len(chunk)
+
+    def run(self, clusters: Iterable[str]) -> Iterator[Outcome]:
+        pending, clusters = deque(), iter(clusters)
+        for chunk in iter(lambda: list(itertools.islice(clusters, self.chunk_size)), []):
+            pending.append(self.submit(chunk))
+            if len(pending) >= 2 * self.workers:
+                yield from self.collect(pending)
+
+        while pending:
+            yield from self.collect(pending)
@@ -0,0 +1,135 @@
+import argparse
+import json
+import sys
+import time
+from collections import deque
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import TextIO
+from typing import Tuple
+from typing import Union
+
+from code import Sentence
+from code import parse_conll
+from code import parse_docbin
+from code import render
+from engine import Engine
+from pipeline import STAGES
+from pipeline import Pipeline
+from utils import NLP
+
+
+def read(lines: Iterable[str]) -> Iterator[Tuple[Optional[str], str, Optional[str]]]:
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            content = record['text'] if 'text' in record else '\n'.join(record['sentences'])
+        except (ValueError, TypeError, KeyError) as e:
+            yield None, '', f"line {number}: {type(e).__name__}: {e}"
+        else:
+            yield record.get('id', number), content, None
+
+
+def number(clusters: Iterable[List[Sentence]]) -> Iterator[Tuple[int, List[Sentence], None]]:
+    for ident, sentences in enumerate(clusters, start=1):
+        yield ident, sentences, None
+
+
+def count(content: Union[str, List[Sentence]]) -> int:
+    # text is counted as the sentencizer segments it, which is also how the caches split it
+    if isinstance(content, str):
+        text = ' '.join(content.split())
+        return len(NLP.segment(text)) if text else 0
+    return len(content)
+
+
+def run(lines: Iterable[str], output: TextIO, engine: Union[Engine, Pipeline],
+        records: Optional[Iterable] = None) -> Dict[str, float]:
+    stats = {'clusters': 0, 'sentences': 0, 'failed': 0, 'truncated': 0}
+    pending = deque()
+
+    def contents() -> Iterator[Union[str, List[Sentence]]]:
+        for ident, content, error in read(lines) if records is None else records:
+            pending.append((ident, error))
+            stats['sentences'] += count(content)
+            yield content
+
+    start = time.perf_counter()
+    for outcome in engine.run(contents()):
+        ident, error = pending.popleft()
+        record = {'id': ident, 'summaries': [{'summary': render(s), 'cost': c} for s, c in outcome.summaries],
+                  'complete': outcome.complete and not error}
+        if error or outcome.error:
+            record['error'] = error or outcome.error
+            stats['failed'] += 1
+        elif not outcome.complete:
+            stats['truncated'] += 1
+        output.write(json.dumps(record) + '\n')
+        stats['clusters'] += 1
+    output.flush()
+    stats['seconds'] = time.perf_counter() - start
+
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Compresses clusters of sentences read as JSONL.')
+    parser.add_argument('input', nargs='?', default='-', help='clusters in the chosen format (- for stdin)')
+    parser.add_argument('-o', '--output', default='-', help='JSONL with "summaries" per line (- for stdout)')
+    parser.add_argument('--weighting', choices=['naive', 'advanced'], default='advanced')
+    parser.add_argument('--num-results', type=int, default=5)
+    parser.add_argument('--min-len', type=int, default=8)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--chunk-size', type=int, default=16)
+    parser.add_argument('--timeout', type=float, help='seconds of search per cluster before keeping the best so far')
+    parser.add_argument('--limit', type=float, help='wall-clock seconds per cluster before its worker is replaced')
+    parser.add_argument('--cache', help='SQLite file caching summaries of previously seen clusters')
+    parser.add_argument('--cache-ttl', type=float, help='seconds before a cached summary expires')
+    parser.add_argument('--format', choices=['jsonl', 'conll', 'docbin'], default='jsonl',
+                        help='JSONL with "sentences" or "text" per line, or pre-tagged CoNLL-U / spaCy DocBin clusters')
+    parser.add_argument('--fast', action='store_true', help='sentencizer and tagger only, without the parser')
+    parser.add_argument('--pipeline', action='store_true', help='overlap the stages of consecutive clusters')
+    parser.add_argument('--stage-workers', type=lambda x: [int(n) for n in x.split(',')], default=[1, 1, 1, 1],
+                        help=f"workers per stage ({','.join(STAGES)}) in pipeline mode")
+    parser.add_argument('--queue-size', type=int, default=4, help='items queued ahead of each stage in pipeline mode')
+    args = parser.parse_args(argv)
+
+    NLP.configure(fast=args.fast)
+    binary = args.format == 'docbin'
+    source = (sys.stdin.buffer if binary else sys.stdin) if args.input == '-' \
+        else open(args.input, 'rb') if binary else open(args.input, encoding='utf-8')
+    target = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        records = None if args.format == 'jsonl' \
+            else number(parse_conll(source) if args.format == 'conll' else parse_docbin(source.read()))
+        engine = Pipeline(args.stage_workers, args.queue_size, args.timeout, args.weighting, args.num_results,
+                          args.min_len) if args.pipeline \
+            else Engine(args.workers, args.chunk_size, args.timeout, args.weighting, args.num_results, args.min_len,
+                        args.cache, args.cache_ttl, records is None, args.limit)
+        with engine:
+            stats = run(source, target, engine, records)
+    finally:
+        for f in (source, target):
+            if f not in (sys.stdin, sys.stdin.buffer, sys.stdout):
+                f.close()
+
+    seconds = stats['seconds'] or float('inf')
+    print(f"Compressed {stats['clusters']} clusters ({stats['failed']} failed, {stats['truncated']} truncated, "
+          f"{stats['sentences']} sentences) "
+          f"in {stats['seconds']:.2f}s: {stats['clusters'] / seconds:.1f} clusters/s, "
+          f"{stats['sentences'] / seconds:.1f} sentences/s", file=sys.stderr)
+    if args.pipeline:
+        for name, usage in engine.report().items():
+            print(f"{name:>8}: {usage['workers']} workers, {usage['items']} items, {usage['utilisation']:.0%} busy, "
+                  f"{usage['idle']:.2f}s starved, {usage['blocked']:.2f}s blocked", file=sys.stderr)
+
+    return 1 if stats['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
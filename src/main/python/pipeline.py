@@ -0,0 +1,193 @@
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
+
+from code import Graph
+from code import Sentence
+from code import Table
+from code import encode
+from code import parse
+from code import search
+from code import weigh
+from engine import Outcome
+from utils import START_METHOD
+
+STAGES = ('parse', 'encode', 'weigh', 'search')
+DONE = None
+
+
+def parsing(content: Union[str, List[Sentence]]) -> List[Sentence]:
+    return parse(content) if isinstance(content, str) else content
+
+
+def encoding(sentences: List[Sentence]) -> Tuple[Graph, Table]:
+    return encode(sentences)
+
+
+def weighing(encoded: Tuple[Graph, Table], weighting: str) -> Graph:
+    return weigh(*encoded, weighting)
+
+
+def searching(weights: Graph, num_results: int, min_len: int,
+              timeout: Optional[float]) -> Tuple[List[Tuple[List[str], float]], bool]:
+    return search(weights, num_results, min_len, timeout)
+
+
+class Stage(object):
+    def __init__(self, name: str, func: Callable, args: tuple = (), workers: int = 1,
+                 pool: Optional[ProcessPoolExecutor] = None, queue_size: int = 4):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.workers = workers
+        self.pool = pool
+        self.inbox = queue.Queue(queue_size)
+        self.threads = []
+        self.lock = threading.Lock()
+        self.items = 0
+        self.busy = 0.0
+        self.idle = 0.0
+        self.blocked = 0.0
+
+    def __call__(self, payload):
+        if self.pool is None:
+            return self.func(payload, *self.args)
+
+        return self.pool.submit(self.func, payload, *self.args).result()
+
+    def account(self, items: int = 0, busy: float = 0.0, idle: float = 0.0, blocked: float = 0.0) -> None:
+        with self.lock:
+            self.items += items
+            self.busy += busy
+            self.idle += idle
+            self.blocked += blocked
+
+    def report(self, seconds: float) -> Dict[str, float]:
+        return {'workers': self.workers, 'items': self.items, 'busy': self.busy, 'idle': self.idle,
+                'blocked': self.blocked, 'queued': self.inbox.qsize(),
+                'utilisation': self.busy / (self.workers * seconds) if seconds else 0.0}
+
+
+class Pipeline(object):
+    def __init__(self, workers: Iterable[int] = (1, 1, 1, 1), queue_size: int = 4, timeout: Optional[float] = None,
+                 weighting: str = 'advanced', num_results: int = 5, min_len: int = 8, processes: bool = True):
+        self.workers = dict(zip(STAGES, workers))
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.weighting = weighting
+        self.num_results = num_results
+        self.min_len = min_len
+        self.processes = processes
+        self.pools = {}
+        self.stages = []
+        self.seconds = 0.0
+        self.cancelled = threading.Event()
+
+    def __enter__(self) -> 'Pipeline':
+        return self.start()
+
+    def __exit__(self, ty, val, tb):
+        self.close()
+
+        return False  # re-raise any exceptions
+
+    def start(self) -> 'Pipeline':
+        if self.processes and not self.pools:
+            context = multiprocessing.get_context(START_METHOD)
+            self.pools = {name: ProcessPoolExecutor(self.workers[name], mp_context=context) for name in STAGES[1:]}
+
+        return self
+
+    def close(self) -> None:
+        for pool in self.pools.values():
+            pool.shutdown()
+        self.pools = {}
+
+    def put(self, target: queue.Queue, item) -> bool:
+        while not self.cancelled.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+
+        return False
+
+    def work(self, stage: Stage, target: queue.Queue) -> None:
+        while True:
+            start = time.perf_counter()
+            item = stage.inbox.get()
+            ready = time.perf_counter()
+            if item is DONE:
+                stage.account(idle=ready - start)
+                return
+
+            order, payload, error = item
+            if error is None and not self.cancelled.is_set():
+                try:
+                    payload = stage(payload)
+                except Exception as e:
+                    payload, error = None, f"{type(e).__name__}: {e}"
+            done = time.perf_counter()
+            self.put(target, (order, payload, error))
+            stage.account(1, done - ready, ready - start, time.perf_counter() - done)
+
+    def feed(self, contents: Iterable, output: queue.Queue, failures: List[Exception]) -> None:
+        try:
+            for order, content in enumerate(contents):
+                if not self.put(self.stages[0].inbox, (order, content, None)):
+                    break
+        except Exception as e:
+            failures.append(e)
+        finally:
+            # every item is queued ahead of the sentinels, so a stage has drained once its threads are joined
+            for stage in self.stages:
+                for _ in range(stage.workers):
+                    stage.inbox.put(DONE)
+                for thread in stage.threads:
+                    thread.join()
+            self.put(output, DONE)
+
+    def run(self, contents: Iterable[Union[str, List[Sentence]]]) -> Iterator[Outcome]:
+        self.start()
+        self.cancelled.clear()
+        output, failures = queue.Queue(self.queue_size), []
+        funcs = [(parsing, ()), (encoding, ()), (weighing, (self.weighting,)),
+                 (searching, (self.num_results, self.min_len, self.timeout))]
+        self.stages = [Stage(name, func, args, self.workers[name], self.pools.get(name), self.queue_size)
+                       for name, (func, args) in zip(STAGES, funcs)]
+        for stage, target in zip(self.stages, [*(stage.inbox for stage in self.stages[1:]), output]):
+            stage.threads = [threading.Thread(target=self.work, args=(stage, target), daemon=True)
+                             for _ in range(stage.workers)]
+            for thread in stage.threads:
+                thread.start()
+
+        start = time.perf_counter()
+        feeder = threading.Thread(target=self.feed, args=(contents, output, failures), daemon=True)
+        feeder.start()
+        pending, expected = {}, 0
+        try:
+            for order, found, error in iter(output.get, DONE):
+                pending[order] = Outcome(found[0], complete=found[1]) if error is None else Outcome([], error, False)
+                while expected in pending:
+                    yield pending.pop(expected)
+                    expected += 1
+        finally:
+            self.cancelled.set()
+            feeder.join()
+            self.seconds = time.perf_counter() - start
+        if failures:
+            raise failures[0]
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        return {stage.name: stage.report(self.seconds) for stage in self.stages}
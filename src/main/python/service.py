@@ -0,0 +1,259 @@
+import asyncio
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from code import Sentence
+from code import parse_many
+from code import render
+from code import summarise
+from utils import METRICS
+from utils import PrometheusSink
+from utils import START_METHOD
+
+Response = Tuple[int, str, bytes]
+
+STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+          500: 'Internal Server Error', 503: 'Service Unavailable'}
+WEIGHTINGS = ('naive', 'advanced')
+
+
+def reply(status: int, payload: dict) -> Response:
+    return status, 'application/json', json.dumps(payload).encode('utf-8')
+
+
+def measure(sentences: List[Sentence], weighting: str, num_results: int, min_len: int, timeout: Optional[float],
+            enabled: bool) -> Tuple[Tuple[List[Tuple[List[str], float]], bool], Optional[dict]]:
+    # encode, weigh and search run in pool workers, so their metrics travel back with each result
+    if not enabled:
+        METRICS.disable()
+        return summarise(sentences, weighting, num_results, min_len, timeout), None
+
+    METRICS.enable()
+    return summarise(sentences, weighting, num_results, min_len, timeout), METRICS.drain()
+
+
+class Job(object):
+    def __init__(self, content: str, weighting: str, num_results: int, min_len: int, future: asyncio.Future):
+        self.content = content
+        self.weighting = weighting
+        self.num_results = num_results
+        self.min_len = min_len
+        self.future = future
+
+
+class Service(object):
+    def __init__(self, host: str = '127.0.0.1', port: int = 8080, max_batch: int = 32, max_wait: float = 0.01,
+                 queue_size: int = 256, workers: Optional[int] = None, weighting: str = 'advanced',
+                 num_results: int = 5, min_len: int = 8, timeout: Optional[float] = None,
+                 max_body: int = 1 << 20):
+        self.host = host
+        self.port = port
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.workers = workers or os.cpu_count() or 1
+        self.weighting = weighting
+        self.num_results = num_results
+        self.min_len = min_len
+        self.timeout = timeout
+        self.max_body = max_body
+        self.queue_size = queue_size
+        self.queue = None
+        self.slots = None
+        self.parser = None
+        self.pool = None
+        self.server = None
+        self.batcher = None
+        self.pending = set()
+        self.stats = {'requests': 0, 'rejected': 0, 'failed': 0, 'batches': 0, 'batched': 0}
+
+    async def __aenter__(self) -> 'Service':
+        return await self.start()
+
+    async def __aexit__(self, ty, val, tb):
+        await self.close()
+
+        return False  # re-raise any exceptions
+
+    async def start(self) -> 'Service':
+        if self.server is None:
+            self.queue = asyncio.Queue(self.queue_size)
+            self.slots = asyncio.Semaphore(2 * self.workers)
+            self.parser = ThreadPoolExecutor(1)
+            self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(START_METHOD))
+            self.batcher = asyncio.ensure_future(self.batch())
+            self.server = await asyncio.start_server(self.handle, self.host, self.port)
+            self.port = self.server.sockets[0].getsockname()[1]
+
+        return self
+
+    async def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.batcher.cancel()
+            await asyncio.gather(self.batcher, *self.pending, return_exceptions=True)
+            self.parser.shutdown()
+            self.pool.shutdown()
+            self.server = None
+
+    async def serve(self) -> None:
+        async with self:
+            await self.server.serve_forever()
+
+    async def collect(self) -> List[Job]:
+        loop = asyncio.get_running_loop()
+        jobs, deadline = [await self.queue.get()], loop.time() + self.max_wait
+        while len(jobs) < self.max_batch:
+            try:
+                jobs.append(self.queue.get_nowait())
+            except asyncio.QueueEmpty:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    jobs.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+        return jobs
+
+    async def batch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            jobs = await self.collect()
+            self.stats['batches'] += 1
+            self.stats['batched'] += len(jobs)
+            try:
+                parsed = await loop.run_in_executor(
+                    self.parser, lambda: list(parse_many([job.content for job in jobs], batch_size=self.max_batch)))
+            except Exception as e:
+                for job in jobs:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                continue
+
+            for job, sentences in zip(jobs, parsed):
+                await self.slots.acquire()
+                task = asyncio.ensure_future(self.finish(job, sentences))
+                self.pending.add(task)
+                task.add_done_callback(self.pending.discard)
+
+    async def finish(self, job: Job, sentences: List[Sentence]) -> None:
+        try:
+            found, usage = await asyncio.get_running_loop().run_in_executor(
+                self.pool, measure, sentences, job.weighting, job.num_results, job.min_len, self.timeout,
+                METRICS.enabled)
+            if usage is not None:
+                METRICS.merge(usage)
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if not job.future.done():
+                job.future.set_result(found)
+        finally:
+            self.slots.release()
+
+    async def compress(self, payload: dict) -> Response:
+        text = payload.get('text')
+        if text is None:
+            sentences = payload.get('sentences', [])
+            if not isinstance(sentences, list) or not all(isinstance(sentence, str) for sentence in sentences):
+                return reply(400, {'error': 'Expected sentences as a list of strings'})
+            text = '\n'.join(sentences)
+        weighting = payload.get('weighting', self.weighting)
+        num_results = payload.get('num_results', self.num_results)
+        min_len = payload.get('min_len', self.min_len)
+        if not isinstance(text, str) or weighting not in WEIGHTINGS \
+                or not isinstance(num_results, int) or not isinstance(min_len, int):
+            return reply(400, {'error': 'Expected text or sentences, a known weighting and integer limits'})
+
+        job = Job(text, weighting, num_results, min_len, asyncio.get_running_loop().create_future())
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.stats['rejected'] += 1
+            return reply(503, {'error': 'Queue is full, retry later'})
+
+        try:
+            summaries, complete = await job.future
+        except Exception as e:
+            self.stats['failed'] += 1
+            return reply(500, {'error': f"{type(e).__name__}: {e}"})
+
+        return reply(200, {'summaries': [{'summary': render(summary), 'cost': cost} for summary, cost in summaries],
+                           'complete': complete})
+
+    def health(self) -> Dict[str, float]:
+        batches = self.stats['batches']
+        return {'status': 'ok', 'queued': self.queue.qsize(), 'capacity': self.queue.maxsize,
+                'in_flight': len(self.pending), **self.stats,
+                'mean_batch': self.stats['batched'] / batches if batches else 0.0}
+
+    def metrics(self) -> str:
+        lines = [] if not METRICS.enabled else [PrometheusSink().render(METRICS)]
+        for name, value in self.health().items():
+            if name != 'status':
+                lines.append(f'msc_service_{name} {value}\n')
+
+        return ''.join(lines)
+
+    async def respond(self, method: str, path: str, body: bytes) -> Response:
+        routes = {'/compress': 'POST', '/health': 'GET', '/metrics': 'GET'}
+        if path not in routes:
+            return reply(404, {'error': f"Unknown path: {path}"})
+        if method != routes[path]:
+            return reply(405, {'error': f"Expected {routes[path]} on {path}"})
+        if path == '/health':
+            return reply(200, self.health())
+        if path == '/metrics':
+            return 200, 'text/plain; version=0.0.4', self.metrics().encode('utf-8')
+
+        self.stats['requests'] += 1
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError as e:
+            return reply(400, {'error': f"Invalid JSON: {e}"})
+        if not isinstance(payload, dict):
+            return reply(400, {'error': 'Expected a JSON object'})
+
+        return await self.compress(payload)
+
+    async def read(self, reader: asyncio.StreamReader) -> Tuple[str, str, Optional[bytes]]:
+        method, path, _ = (await reader.readline()).decode('latin-1').split(' ', 2)
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        size = int(headers.get('content-length', 0))
+        if size > self.max_body:
+            return method, path, None
+
+        return method, path.split('?', 1)[0], await reader.readexactly(size)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                method, path, body = await self.read(reader)
+            except (ValueError, asyncio.IncompleteReadError):
+                status, kind, content = reply(400, {'error': 'Malformed request'})
+            else:
+                status, kind, content = await self.respond(method, path, body) if body is not None \
+                    else reply(413, {'error': f"Body exceeds {self.max_body} bytes"})
+            writer.write(f'HTTP/1.1 {status} {STATUS[status]}\r\nContent-Type: {kind}\r\n'
+                         f'Content-Length: {len(content)}\r\nConnection: close\r\n\r\n'.encode('latin-1') + content)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
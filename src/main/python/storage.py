@@ -0,0 +1,111 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Dict
+from typing import List
+from typing import Optional
+
+from code import Graph
+from code import Table
+from compact import CompactGraph
+
+MAGIC = b'MSCG'
+VERSION = 1
+HEADER = struct.Struct('<4sHHqqqqq')
+WEIGHTINGS = ('naive', 'advanced')
+BIG_ENDIAN = 1 << len(WEIGHTINGS)
+
+
+def flatten(graph: CompactGraph, weights: Graph) -> array:
+    return array('d', (weights[graph.names[tail]][graph.names[graph.targets[e]]]
+                       for tail in range(graph.size) for e in graph.edges(tail)))
+
+
+def save(path: str, graph: Graph, lookup: Table, weights: Optional[Dict[str, Graph]] = None) -> None:
+    weights = weights or {}
+    unknown = set(weights) - set(WEIGHTINGS)
+    if unknown:
+        raise ValueError(f"Unknown weighting: {', '.join(sorted(unknown))}")
+
+    compact = CompactGraph.from_dict(graph, lookup)
+    encoded = [name.encode('utf-8') for name in compact.names]
+    bounds = array('q', [0])
+    for name in encoded:
+        bounds.append(bounds[-1] + len(name))
+    flags = sum(1 << idx for idx, weighting in enumerate(WEIGHTINGS) if weighting in weights)
+    flags |= BIG_ENDIAN if sys.byteorder == 'big' else 0
+    sections = [bounds, compact.offsets, compact.targets, compact.counts,
+                *(flatten(compact, weights[weighting]) for weighting in WEIGHTINGS if weighting in weights),
+                compact.postings, compact.sentences, compact.positions]
+
+    with open(f'{path}.tmp', 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, flags, len(compact), compact.size, len(compact.targets),
+                            len(compact.sentences), bounds[-1]))
+        for section in sections:
+            section.tofile(f)
+        f.write(b''.join(encoded))
+    os.replace(f'{path}.tmp', path)
+
+
+class Store(object):
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < HEADER.size:
+                raise ValueError(f"Not an encoded graph: {path}")
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, flags, nodes, size, edges, refs, blob = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC or version != VERSION or bool(flags & BIG_ENDIAN) != (sys.byteorder == 'big'):
+            self.buffer.close()
+            raise ValueError(f"Not an encoded graph (version {VERSION}, {sys.byteorder}-endian): {path}")
+
+        self.view = memoryview(self.buffer)
+        self.cursor = HEADER.size
+        bounds = self.take(nodes + 1, 'q')
+        self.size = size
+        self.offsets = self.take(nodes + 1, 'q')
+        self.targets = self.take(edges, 'q')
+        self.counts = self.take(edges, 'q')
+        self.weights = {weighting: self.take(edges, 'd')
+                        for idx, weighting in enumerate(WEIGHTINGS) if flags & (1 << idx)}
+        self.postings = self.take(nodes + 1, 'q')
+        self.sentences = self.take(refs, 'q')
+        self.positions = self.take(refs, 'q')
+        names = self.view[self.cursor:self.cursor + blob]
+        self.names = [str(names[bounds[idx]:bounds[idx + 1]], 'utf-8') for idx in range(nodes)]
+
+    def __enter__(self) -> 'Store':
+        return self
+
+    def __exit__(self, ty, val, tb):
+        self.close()
+
+        return False  # re-raise any exceptions
+
+    def take(self, count: int, fmt: str) -> memoryview:
+        start, self.cursor = self.cursor, self.cursor + 8 * count
+        return self.view[start:self.cursor].cast(fmt)
+
+    def compact(self, weighting: Optional[str] = None) -> CompactGraph:
+        return CompactGraph(self.names, self.size, self.offsets, self.targets, self.counts,
+                            None if weighting is None else self.weights[weighting],
+                            self.postings, self.sentences, self.positions)
+
+    def graph(self) -> Graph:
+        return self.compact().to_dict()
+
+    def table(self) -> Table:
+        return self.compact().to_table()
+
+    def weighted(self, weighting: str) -> Graph:
+        return self.compact(weighting).to_dict()
+
+    def weightings(self) -> List[str]:
+        return list(self.weights)
+
+    def close(self) -> None:
+        for section in (self.offsets, self.targets, self.counts, *self.weights.values(),
+                        self.postings, self.sentences, self.positions, self.view):
+            section.release()
+        self.buffer.close()
@@ -1,33 +1,332 @@
+import bisect
+import cProfile
 import datetime
+import functools
+import importlib.metadata
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import pstats
+import threading
 import time
+import tracemalloc
+from collections import deque
+from typing import Callable
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import TextIO
 
-import spacy
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+# parse only reads sentence boundaries, text, fine-grained tags and the lexical punct/stop flags
+FAST_DISABLE = ('parser', 'ner', 'lemmatizer')
+# threads are already running when pools start their workers, and forking them could copy locks they hold
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+class MemorySink(object):
+    def __init__(self, capacity: int = 10000):
+        self.events = deque(maxlen=capacity)
+
+    def emit(self, event: dict) -> None:
+        self.events.append(event)
+
+    def flush(self, metrics: 'Metrics') -> None:
+        pass
+
+
+class JsonLinesSink(object):
+    def __init__(self, target: TextIO):
+        self.target = target
+        self.lock = threading.Lock()
+
+    def emit(self, event: dict) -> None:
+        line = json.dumps(event)
+        with self.lock:
+            self.target.write(line + '\n')
+
+    def flush(self, metrics: 'Metrics') -> None:
+        self.target.flush()
+
+
+class PrometheusSink(object):
+    def __init__(self, path: Optional[str] = None, prefix: str = 'msc'):
+        self.path = path
+        self.prefix = prefix
+
+    def emit(self, event: dict) -> None:
+        pass
+
+    def flush(self, metrics: 'Metrics') -> None:
+        if self.path is None:
+            return
+
+        with open(f'{self.path}.tmp', 'w', encoding='utf-8') as f:
+            f.write(self.render(metrics))
+        os.replace(f'{self.path}.tmp', self.path)
+
+    def render(self, metrics: 'Metrics') -> str:
+        lines = []
+        for stage, histogram in sorted(metrics.histograms.items()):
+            name = f'{self.prefix}_{stage}_seconds'
+            lines.append(f'# TYPE {name} histogram')
+            for bound, count in zip([*metrics.buckets, '+Inf'], itertools.accumulate(histogram['buckets'])):
+                lines.append(f'{name}_bucket{{le="{bound}"}} {count}')
+            lines.append(f"{name}_sum {histogram['sum']}")
+            lines.append(f"{name}_count {histogram['count']}")
+        for stage, counters in sorted(metrics.totals.items()):
+            for counter, value in sorted(counters.items()):
+                name, kind = (f'{self.prefix}_{stage}_{counter}', 'gauge') if counter.startswith('peak') \
+                    else (f'{self.prefix}_{stage}_{counter}_total', 'counter')
+                lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+class Metrics(object):
+    def __init__(self, sinks: Iterable = (), buckets: Iterable[float] = BUCKETS):
+        self.sinks = list(sinks)
+        self.buckets = tuple(buckets)
+        self.enabled = bool(self.sinks)
+        self.histograms = {}
+        self.totals = {}
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def enable(self, *sinks) -> 'Metrics':
+        self.sinks.extend(sinks)
+        self.enabled = True
+
+        return self
+
+    def disable(self) -> 'Metrics':
+        self.enabled = False
+
+        return self
+
+    def reset(self) -> None:
+        with self.lock:
+            self.histograms.clear()
+            self.totals.clear()
+
+    def active(self) -> List['Timer']:
+        if not hasattr(self.local, 'timers'):
+            self.local.timers = []
+
+        return self.local.timers
+
+    def count(self, **counters: float) -> None:
+        if not self.enabled:
+            return
+
+        timers = self.active()
+        if timers:
+            for name, value in counters.items():
+                timers[-1].counters[name] = timers[-1].counters.get(name, 0) + value
+
+    def record(self, stage: str, seconds: Optional[float] = None, **counters: float) -> None:
+        if not self.enabled:
+            return
+
+        event = {'stage': stage, 'time': time.time(), **counters}
+        with self.lock:
+            if seconds is not None:
+                histogram = self.histograms.setdefault(stage, {'buckets': [0] * (len(self.buckets) + 1),
+                                                               'sum': 0.0, 'count': 0})
+                histogram['buckets'][bisect.bisect_left(self.buckets, seconds)] += 1
+                histogram['sum'] += seconds
+                histogram['count'] += 1
+                event['seconds'] = seconds
+                if seconds > 0 and 'tokens' in counters:
+                    event['tokens_per_second'] = counters['tokens'] / seconds
+            totals = self.totals.setdefault(stage, {})
+            for name, value in counters.items():
+                previous = totals.get(name, 0)
+                totals[name] = max(previous, value) if name.startswith('peak') else previous + value
+        for sink in self.sinks:
+            sink.emit(event)
+
+    def drain(self) -> dict:
+        with self.lock:
+            snapshot = {'histograms': self.histograms, 'totals': self.totals}
+            self.histograms, self.totals = {}, {}
+
+        return snapshot
+
+    def merge(self, snapshot: dict) -> None:
+        # folds in the aggregates drained from another process, whose per-stage events stay with its own sinks
+        with self.lock:
+            for stage, other in snapshot['histograms'].items():
+                histogram = self.histograms.setdefault(stage, {'buckets': [0] * (len(self.buckets) + 1),
+                                                               'sum': 0.0, 'count': 0})
+                histogram['buckets'] = [a + b for a, b in zip(histogram['buckets'], other['buckets'])]
+                histogram['sum'] += other['sum']
+                histogram['count'] += other['count']
+            for stage, counters in snapshot['totals'].items():
+                totals = self.totals.setdefault(stage, {})
+                for name, value in counters.items():
+                    previous = totals.get(name, 0)
+                    totals[name] = max(previous, value) if name.startswith('peak') else previous + value
+
+    def flush(self) -> None:
+        for sink in self.sinks:
+            sink.flush(self)
+
+
+METRICS = Metrics()
 
 
 class Timer(object):
-    def __init__(self, name: str = "(block)", verbose: bool = True):
+    def __init__(self, name: str = "(block)", verbose: bool = True, metrics: Optional[Metrics] = None,
+                 profile: bool = False, trace: bool = False):
         self.name = name
         self.verbose = verbose
+        self.metrics = metrics
+        self.profile = profile
+        self.trace = trace
+        self.counters = {}
+        self.profiler = None
+        self.stats = None
+        self.end_time = None
 
     def __call__(self) -> float:
-        return time.perf_counter() - self.start_time
+        return (self.end_time or time.perf_counter()) - self.start_time
 
     def __str__(self) -> str:
         return str(datetime.timedelta(seconds=self()))
 
     def __enter__(self) -> 'Timer':
-        self.start_time = time.perf_counter()
         if self.verbose:
             print(f'{self.name}...')
+        if self.metrics is not None and self.metrics.enabled:
+            self.metrics.active().append(self)
+        if self.trace:
+            tracemalloc.start()
+        if self.profile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.end_time = None
+        self.start_time = time.perf_counter()
 
         return self
 
     def __exit__(self, ty, val, tb):
+        self.end_time = time.perf_counter()
+        if self.profile:
+            self.profiler.disable()
+            self.stats = pstats.Stats(self.profiler, stream=io.StringIO())
+        if self.trace:
+            self.counters['peak_kb'] = tracemalloc.get_traced_memory()[1] / 1024
+            tracemalloc.stop()
+        timers = [] if self.metrics is None else self.metrics.active()
+        if timers and timers[-1] is self:
+            timers.pop()
+            if val is None:
+                self.metrics.record(self.name, self(), **self.counters)
         if self.verbose:
             print(f'{self.name}: completed in {self}\n')
 
         return False  # re-raise any exceptions
 
 
-with Timer('NLP Loading'):
-    NLP = spacy.load("en_core_web_sm")
+def measured(stage: str) -> Callable:
+    def decorate(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return func(*args, **kwargs)
+
+            with Timer(stage, verbose=False, metrics=METRICS):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def sentencizer(nlp):
+    import spacy
+
+    # spaCy 2 (pinned by requirements.txt) adds components, spaCy 3 adds them by name
+    legacy = spacy.__version__.startswith('2.')
+    nlp.add_pipe(nlp.create_pipe('sentencizer') if legacy else 'sentencizer', first=True)
+
+    return nlp
+
+
+class Model(object):
+    def __init__(self, name: str = "en_core_web_sm", disable: Iterable[str] = ("ner",), fast: bool = False):
+        self.name = name
+        self.disable = tuple(disable)
+        self.fast = fast
+        self.nlp = None
+        self.release = None
+        self.splitter = None
+        self.lock = threading.Lock()
+
+    def __call__(self, text: str):
+        return self.load()(text)
+
+    def __getattr__(self, name: str):
+        if name.startswith('__'):
+            raise AttributeError(name)
+
+        return getattr(self.load(), name)
+
+    def __getstate__(self) -> dict:
+        return {'name': self.name, 'disable': self.disable, 'fast': self.fast}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__(**state)
+
+    @property
+    def version(self) -> str:
+        if self.release is None:
+            try:
+                self.release = importlib.metadata.version(self.name)
+            except importlib.metadata.PackageNotFoundError:
+                self.release = self.load().meta.get('version', '')
+
+        return self.release
+
+    @property
+    def signature(self) -> str:
+        return f"{self.name}\0{self.version}\0fast" if self.fast else f"{self.name}\0{self.version}"
+
+    def configure(self, name: Optional[str] = None, disable: Optional[Iterable[str]] = None,
+                  fast: Optional[bool] = None) -> 'Model':
+        with self.lock:
+            name = self.name if name is None else name
+            disable = self.disable if disable is None else tuple(disable)
+            fast = self.fast if fast is None else fast
+            if (name, disable, fast) != (self.name, self.disable, self.fast):
+                self.name, self.disable, self.fast, self.nlp, self.release = name, disable, fast, None, None
+
+        return self
+
+    def load(self):
+        if self.nlp is None:
+            with self.lock:
+                if self.nlp is None:
+                    import spacy
+
+                    nlp = spacy.load(self.name, disable=[*self.disable, *(FAST_DISABLE if self.fast else ())])
+                    self.nlp = sentencizer(nlp) if self.fast and not nlp.has_pipe('sentencizer') else nlp
+
+        return self.nlp
+
+    def segment(self, text: str) -> List[str]:
+        if self.splitter is None:
+            with self.lock:
+                if self.splitter is None:
+                    import spacy
+
+                    self.splitter = sentencizer(spacy.blank('en'))
+
+        return [sent.text for sent in self.splitter(text).sents]
+
+
+NLP = Model()
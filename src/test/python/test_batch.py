@@ -0,0 +1,61 @@
+import io
+import json
+from unittest import TestCase
+
+from assertpy import assert_that
+
+from code import compress
+from code import condense
+from code import render
+from engine import Engine
+from main import number
+from main import read
+from main import run
+from test_main import SENTENCES
+from test_main import TOKENS
+
+
+# noinspection PyMethodMayBeStatic
+class BatchTest(TestCase):
+
+    def test__read(self):
+        for i, (lines, expected) in enumerate([
+            ([], []),
+            (['', '  \n'], []),
+            (['{"id": "a", "sentences": ["One.", "Two."]}'], [('a', 'One.\nTwo.', None)]),
+            (['\n', '{"text": "One. Two."}'], [(2, 'One. Two.', None)]),
+            (['{"id": "a"}'], [(None, '', "line 1: KeyError: 'sentences'")]),
+            (['[1]'], [(None, '', 'line 1: TypeError: list indices must be integers or slices, not str')]),
+        ]):
+            with self.subTest(i=i, params=(lines, expected)):
+                result = list(read(lines))
+
+                assert_that(result, 'read').is_equal_to(expected)
+
+    def test__run(self):
+        lines = [json.dumps({'id': 'clinton', 'text': SENTENCES}), '{', json.dumps({'sentences': []}),
+                 json.dumps({'id': 'upper', 'sentences': SENTENCES.upper().splitlines()})]
+        output = io.StringIO()
+        with Engine(workers=2, chunk_size=1, num_results=3, min_len=6) as engine:
+            stats = run(lines, output, engine)
+
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        expected = [[{'summary': render(s), 'cost': c} for s, c in compress(c, num_results=3, min_len=6)]
+                    for c in [SENTENCES, '', '', SENTENCES.upper()]]
+        assert_that([r['id'] for r in records], 'run').is_equal_to(['clinton', None, 3, 'upper'])
+        assert_that([r['summaries'] for r in records], 'run').is_equal_to(expected)
+        assert_that([r.get('error', '')[:6] for r in records], 'run').is_equal_to(['', 'line 2', '', ''])
+        assert_that([r['complete'] for r in records], 'run').is_equal_to([True, False, True, True])
+        assert_that(stats, 'run').contains_entry({'clusters': 4}, {'sentences': 9}, {'failed': 1}, {'truncated': 0})
+
+    def test__run_parsed(self):
+        output = io.StringIO()
+        with Engine(workers=1, num_results=3, min_len=6, preload=False) as engine:
+            stats = run([], output, engine, number([TOKENS, [], TOKENS[1:]]))
+
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        expected = [[{'summary': render(s), 'cost': c} for s, c in condense(c, num_results=3, min_len=6)]
+                    for c in [TOKENS, [], TOKENS[1:]]]
+        assert_that([r['id'] for r in records], 'run').is_equal_to([1, 2, 3])
+        assert_that([r['summaries'] for r in records], 'run').is_equal_to(expected)
+        assert_that(stats, 'run').contains_entry({'clusters': 3}, {'sentences': 7}, {'failed': 0})
@@ -0,0 +1,77 @@
+from unittest import TestCase
+
+from assertpy import assert_that
+
+from bench import STOP_WORDS
+from bench import agreement
+from bench import compare
+from bench import profile
+from bench import synthetic_cluster
+
+
+# noinspection PyMethodMayBeStatic
+class BenchTest(TestCase):
+
+    def test__synthetic_cluster(self):
+        for i, (size, length, stop_ratio) in enumerate([
+            (0, 20, 0.3),
+            (4, 10, 0.3),
+            (50, 20, 1.0),
+        ]):
+            with self.subTest(i=i, params=(size, length, stop_ratio)):
+                result = synthetic_cluster(size, length=length, stop_ratio=stop_ratio)
+                lengths = {len(sentence) - 2 for sentence in result}
+
+                assert_that(result, 'synthetic_cluster').is_length(size)
+                expected = synthetic_cluster(size, length, 400, 0.6, stop_ratio)
+                assert_that(result, 'synthetic_cluster').is_equal_to(expected)
+                assert_that({sentence[0] for sentence in result}, 'synthetic_cluster').is_subset_of({'<START>'})
+                assert_that({sentence[-1] for sentence in result}, 'synthetic_cluster').is_subset_of({'<END>'})
+                assert_that(lengths, 'synthetic_cluster').is_subset_of(set(range(length // 2, length * 3 // 2 + 1)))
+
+    def test__stop_ratio(self):
+        for i, (stop_ratio, expected) in enumerate([
+            (0.0, False),
+            (1.0, True),
+        ]):
+            with self.subTest(i=i, params=(stop_ratio, expected)):
+                result = synthetic_cluster(10, stop_ratio=stop_ratio)
+
+                assert_that(all(w in STOP_WORDS for s in result for w in s[1:-1]), 'stop_ratio').is_equal_to(expected)
+
+    def test__profile(self):
+        result = profile(synthetic_cluster(8), memory=False)
+
+        assert_that([r['stage'] for r in result], 'profile').is_equal_to(
+            ['encode', 'naive_weight', 'advanced_weight', 'traverse_naive', 'traverse_advanced'])
+        assert_that({r['sentences'] for r in result}, 'profile').is_equal_to({8})
+
+    def test__compare(self):
+        baseline = [{'stage': 'encode', 'sentences': 4, 'seconds': 0.01, 'peak_kb': 100}]
+        for i, (seconds, peak_kb, expected) in enumerate([
+            (0.01, 100, 0),
+            (0.011, 110, 0),
+            (0.02, 100, 1),
+            (0.01, 200, 1),
+            (0.02, 200, 2),
+        ]):
+            with self.subTest(i=i, params=(seconds, peak_kb, expected)):
+                current = [{'stage': 'encode', 'sentences': 4, 'seconds': seconds, 'peak_kb': peak_kb}]
+
+                assert_that(compare(baseline, current), 'compare').is_length(expected)
+
+    def test__agreement(self):
+        cluster = synthetic_cluster(4, seed=1)
+        merged = [[*cluster[0][:-1], *cluster[1][1:]], *cluster[2:]]
+        retagged = [[*sentence[:-2], 'x:NN:_', sentence[-1]] for sentence in cluster]
+        for i, (candidate, tokens, sentences) in enumerate([
+            ([cluster], 1.0, 1.0),
+            ([merged], 1.0, 0.5),
+            ([retagged], 1 - 4 / sum(len(s) - 2 for s in cluster), 0.0),
+            ([[]], 0.0, 0.0),
+        ]):
+            with self.subTest(i=i, params=(candidate, tokens, sentences)):
+                result = agreement([cluster], candidate)
+
+                assert_that(result['token_agreement'], 'agreement').is_close_to(tokens, 1e-9)
+                assert_that(result['sentence_agreement'], 'agreement').is_equal_to(sentences)
@@ -0,0 +1,122 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from assertpy import assert_that
+
+from cache import ParseCache
+from cache import ResultCache
+from cache import fingerprint
+from code import condense
+from test_main import ADVANCE_SUMMARIES
+from test_main import SENTENCES
+from test_main import TOKENS
+
+
+# noinspection PyMethodMayBeStatic
+class ParseCacheTest(TestCase):
+
+    def test__parse(self):
+        cache = ParseCache()
+
+        assert_that(cache.parse(SENTENCES), 'parse').is_equal_to(TOKENS)
+        assert_that(cache.stats(), 'stats').contains_entry({'hits': 0}, {'misses': 4})
+        assert_that(cache.parse(SENTENCES), 'parse').is_equal_to(TOKENS)
+        assert_that(cache.stats(), 'stats').contains_entry({'hits': 4}, {'misses': 4})
+
+    def test__parse_many(self):
+        cache = ParseCache()
+        result = list(cache.parse_many([SENTENCES, '', '\n'.join(reversed(SENTENCES.splitlines()))]))
+
+        assert_that(result, 'parse_many').is_equal_to([TOKENS, [], list(reversed(TOKENS))])
+        assert_that(cache.hit_rate, 'hit_rate').is_equal_to(0.5)
+
+    def test__wrapped(self):
+        cache = seeded()
+        for i, content in enumerate([
+            SENTENCES.replace('wanted to', 'wanted\nto').replace(', visited', ',\n  visited'),
+            ' '.join(SENTENCES.splitlines()),
+        ]):
+            with self.subTest(i=i, content=content):
+                assert_that(cache.parse(content), 'parse').is_equal_to(TOKENS)
+        assert_that(cache.stats(), 'stats').contains_entry({'hits': 8}, {'misses': 0})
+
+    def test__capacity(self):
+        cache = ParseCache(capacity=2)
+        cache.parse(SENTENCES)
+
+        assert_that(cache.memory, 'capacity').is_length(2)
+
+    def test__persistence(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'parses.db')
+            ParseCache(path=path, max_rows=3).parse(SENTENCES)
+            cache = ParseCache(path=path)
+
+            assert_that(cache.connect().execute('SELECT COUNT(*) FROM parses').fetchone(), 'rows').is_equal_to((3,))
+            assert_that(cache.parse(SENTENCES), 'parse').is_equal_to(TOKENS)
+            assert_that(cache.stats(), 'stats').contains_entry({'hits': 3}, {'misses': 1})
+
+
+def seeded() -> ParseCache:
+    parser = ParseCache()
+    for line, sentence in zip(filter(None, (line.strip() for line in SENTENCES.splitlines())), TOKENS):
+        parser.put(parser.key(line), [sentence])
+
+    return parser
+
+
+# noinspection PyMethodMayBeStatic
+class ResultCacheTest(TestCase):
+
+    def test__fingerprint(self):
+        shuffled = '\n'.join(reversed(SENTENCES.splitlines()))
+
+        assert_that(fingerprint(shuffled), 'fingerprint').is_equal_to(fingerprint(f"  {SENTENCES}\n\n"))
+        assert_that(fingerprint(shuffled, ordered=True), 'ordered').is_not_equal_to(fingerprint(SENTENCES, True))
+        assert_that(fingerprint(' '.join(reversed(SENTENCES.splitlines()))), 'line').is_equal_to(fingerprint(shuffled))
+        assert_that(fingerprint('Bill visited China. Hillary stayed.'), 'sentences').is_not_equal_to(
+            fingerprint('Bill visited China.\nHillary stayed. Bill left.'))
+
+    def test__compress(self):
+        cache = ResultCache(parser=seeded())
+        expected = condense(TOKENS, 'advanced', 5, 8)
+
+        assert_that(cache.compress(SENTENCES), 'compress').is_equal_to(expected)
+        assert_that(cache.compress('\n'.join(reversed(SENTENCES.splitlines()))), 'compress').is_equal_to(expected)
+        assert_that(cache.compress(SENTENCES, 'naive'), 'compress').is_equal_to(condense(TOKENS, 'naive', 5, 8))
+        assert_that(cache.stats(), 'stats').contains_entry({'hits': 1}, {'misses': 2}, {'size': 2})
+
+    def test__incomplete(self):
+        cache = ResultCache(parser=seeded())
+
+        assert_that(cache.summarise(SENTENCES, budget=0), 'summarise').is_equal_to(([], False))
+        assert_that(cache.memory, 'incomplete').is_empty()
+        assert_that(cache.summarise(SENTENCES), 'summarise').is_equal_to((condense(TOKENS), True))
+        assert_that(cache.summarise(SENTENCES), 'summarise').is_equal_to((condense(TOKENS), True))
+        assert_that(cache.stats(), 'stats').contains_entry({'hits': 1}, {'misses': 2})
+
+    def test__expiry(self):
+        cache = ResultCache(ttl=-1.0)
+        key = cache.key(SENTENCES, 'advanced', 5, 8)
+        cache.put(key, ADVANCE_SUMMARIES)
+
+        assert_that(cache.get(key), 'get').is_none()
+        assert_that(cache.stats(), 'stats').contains_entry({'expired': 1}, {'misses': 1}, {'size': 0})
+
+    def test__capacity(self):
+        cache = ResultCache(capacity=2)
+        for num_results in range(1, 4):
+            cache.put(cache.key(SENTENCES, 'advanced', num_results, 8), ADVANCE_SUMMARIES[:num_results])
+
+        assert_that(cache.memory, 'capacity').is_length(2)
+        assert_that(cache.get(cache.key(SENTENCES, 'advanced', 1, 8)), 'evicted').is_none()
+
+    def test__persistence(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'results.db')
+            ResultCache(path=path, parser=seeded()).compress(SENTENCES)
+            cache = ResultCache(path=path)
+
+            assert_that(cache.compress(SENTENCES), 'compress').is_equal_to(condense(TOKENS, 'advanced', 5, 8))
+            assert_that(cache.stats(), 'stats').contains_entry({'hits': 1}, {'misses': 0})
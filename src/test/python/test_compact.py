@@ -0,0 +1,110 @@
+from unittest import TestCase
+
+from assertpy import assert_that
+
+from code import bound
+from code import dedupe
+from code import encode as encode_dict
+from compact import Arrays
+from compact import CompactGraph
+from compact import advanced_weight
+from compact import encode
+from compact import naive_weight
+from compact import search
+from compact import traverse
+from test_main import ADVANCE_SUMMARIES
+from test_main import ADVANCE_WEIGHT
+from test_main import GRAPH
+from test_main import NAIVE_SUMMARIES
+from test_main import NAIVE_WEIGHT
+from test_main import TABLE
+from test_main import TOKENS
+
+
+# noinspection PyMethodMayBeStatic
+class CompactGraphTest(TestCase):
+
+    def test__from_dict(self):
+        for i, (graph, table, weighted) in enumerate([
+            ({}, {}, False),
+            (GRAPH, TABLE, False),
+            (NAIVE_WEIGHT, TABLE, True),
+            (ADVANCE_WEIGHT, TABLE, True),
+        ]):
+            with self.subTest(i=i, params=(graph, table, weighted)):
+                result = CompactGraph.from_dict(graph, table, weighted=weighted)
+
+                assert_that(result.to_dict(), 'to_dict').is_equal_to(graph)
+                assert_that(list(result.to_dict()), 'to_dict').is_equal_to(list(graph))
+                assert_that(result.to_table(), 'to_table').is_equal_to(table)
+
+    def test__encode(self):
+        for i, (tokens, exp_graph, exp_table) in enumerate([
+            ([], {}, {}),
+            (TOKENS, GRAPH, TABLE),
+        ]):
+            with self.subTest(i=i, params=(tokens, exp_graph, exp_table)):
+                result = encode(tokens)
+
+                assert_that(result.to_dict(), 'encode').is_equal_to(exp_graph)
+                assert_that(result.to_table(), 'encode').is_equal_to(exp_table)
+
+    def test__encode_members(self):
+        result = encode(*dedupe(TOKENS + TOKENS[1:3], threshold=1.0))
+        graph, table = encode_dict(*dedupe(TOKENS + TOKENS[1:3], threshold=1.0))
+
+        assert_that(result.to_dict(), 'encode').is_equal_to(graph)
+        assert_that(list(result.to_dict()), 'encode').is_equal_to(list(graph))
+        assert_that(result.to_table(), 'encode').is_equal_to(table)
+        assert_that(result.node('<START>'), 'node').is_equal_to(0)
+        assert_that(result.node('unknown'), 'node').is_none()
+
+    def test__weight(self):
+        for i, (weight, expected) in enumerate([
+            (naive_weight, NAIVE_WEIGHT),
+            (advanced_weight, ADVANCE_WEIGHT),
+        ]):
+            with self.subTest(i=i, params=(weight, expected)):
+                result = weight(CompactGraph.from_dict(GRAPH, TABLE))
+
+                assert_that(result.to_dict(), weight.__name__).is_equal_to(expected)
+
+    def test__bound(self):
+        for i, (weight, min_len) in enumerate([
+            (NAIVE_WEIGHT, 6),
+            (ADVANCE_WEIGHT, 2),
+            ({'<START>': {'a:VB:_': -1.0}, 'a:VB:_': {'<END>': 0.5}}, 1),
+        ]):
+            with self.subTest(i=i, params=(weight, min_len)):
+                graph = CompactGraph.from_dict(weight, weighted=True)
+                result = bound(Arrays(graph), min_len)
+                expected = bound(weight, min_len)
+
+                assert_that([{graph.names[k]: v for k, v in layer.items()} for layer in result.length],
+                            'length').is_equal_to(expected.length)
+                assert_that({graph.names[k]: v for k, v in result.verb.items()}, 'verb').is_equal_to(expected.verb)
+                assert_that(result.admissible, 'admissible').is_equal_to(expected.admissible)
+
+    def test__traverse(self):
+        for i, (weight, results, length, expected) in enumerate([
+            ({}, 5, 6, []),
+            (NAIVE_WEIGHT, 0, 6, []),
+            (NAIVE_WEIGHT, 5, 50, []),
+            (NAIVE_WEIGHT, 5, 6, NAIVE_SUMMARIES),
+            (ADVANCE_WEIGHT, 5, 6, ADVANCE_SUMMARIES),
+        ]):
+            with self.subTest(i=i, params=(weight, results, length, expected)):
+                result = traverse(CompactGraph.from_dict(weight, weighted=True), results, length)
+
+                assert_that(result, 'traverse').is_equal_to(expected)
+
+    def test__search(self):
+        for i, (weight, budget, expected) in enumerate([
+            (naive_weight, None, (NAIVE_SUMMARIES, True)),
+            (advanced_weight, None, (ADVANCE_SUMMARIES, True)),
+            (advanced_weight, 0, ([], False)),
+        ]):
+            with self.subTest(i=i, params=(weight, budget, expected)):
+                result = search(weight(encode(TOKENS)), 5, 6, budget=budget)
+
+                assert_that(result, 'search').is_equal_to(expected)
@@ -0,0 +1,63 @@
+import time
+from unittest import TestCase
+
+from assertpy import assert_that
+
+from code import compress
+from code import condense
+from engine import Engine
+from engine import Outcome
+from test_main import SENTENCES
+from test_main import TOKENS
+
+
+class Stuck(object):
+    # unpickling it blocks the worker that received it, like a cluster that never finishes
+    def __reduce__(self):
+        return time.sleep, (60,)
+
+
+# noinspection PyMethodMayBeStatic
+class EngineTest(TestCase):
+
+    def test__run(self):
+        clusters = [SENTENCES, '', SENTENCES, SENTENCES.upper()]
+        for i, (workers, chunk_size) in enumerate([(1, 1), (2, 1), (2, 3)]):
+            with self.subTest(i=i, params=(workers, chunk_size)):
+                with Engine(workers=workers, chunk_size=chunk_size, num_results=3, min_len=6) as engine:
+                    result = list(engine.run(clusters))
+
+                expected = [Outcome(compress(c, num_results=3, min_len=6)) for c in clusters]
+                assert_that(result, 'run').is_equal_to(expected)
+
+    def test__failure(self):
+        with Engine(workers=2, chunk_size=2, min_len=6) as engine:
+            result = list(engine.run([SENTENCES, None, SENTENCES]))
+
+        assert_that(result[0], 'run').is_equal_to(result[2])
+        assert_that(result[0].error, 'run').is_none()
+        assert_that(result[1].summaries, 'run').is_empty()
+        assert_that(result[1].error, 'run').starts_with('TypeError')
+        assert_that(result[1].complete, 'run').is_false()
+
+    def test__timeout(self):
+        with Engine(workers=1, timeout=1e-6, preload=False) as engine:
+            result = list(engine.run([TOKENS * 50]))
+
+        assert_that(result, 'run').is_length(1)
+        assert_that(result[0].error, 'run').is_none()
+        assert_that(result[0].complete, 'run').is_false()
+
+    def test__limit(self):
+        clusters = [TOKENS, Stuck(), TOKENS, TOKENS[1:], TOKENS, TOKENS[1:]]
+        expected = [Outcome(condense(c, min_len=6)) for c in (TOKENS, TOKENS[1:])]
+        for i, workers in enumerate([1, 2]):
+            with self.subTest(i=i, workers=workers):
+                start = time.perf_counter()
+                with Engine(workers=workers, chunk_size=2, limit=1.0, min_len=6, preload=False) as engine:
+                    result = list(engine.run(clusters))
+
+                assert_that(time.perf_counter() - start, 'limit').is_less_than(30)
+                assert_that(result[1].error, 'run').starts_with('TimeoutError')
+                assert_that(result[1].complete, 'run').is_false()
+                assert_that(result[:1] + result[2:], 'run').is_equal_to(expected[:1] + expected * 2)
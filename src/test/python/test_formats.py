@@ -0,0 +1,47 @@
+from unittest import TestCase
+
+import spacy
+from assertpy import assert_that
+from spacy.tokens import Doc
+from spacy.tokens import DocBin
+
+from code import Token
+from code import parse_conll
+from code import parse_docbin
+from test_main import TOKENS
+
+
+# noinspection PyMethodMayBeStatic
+class FormatsTest(TestCase):
+
+    def test__parse_conll(self):
+        lines = ['# newdoc id = first']
+        for idx, sentence in enumerate(TOKENS, start=1):
+            lines.append(f'# sent_id = {idx}')
+            for pos, token in enumerate([*sentence[1:-1], ',:,:_', '.:.:_'], start=1):
+                word, tag, _ = token.rsplit(':', 2)
+                lines.append(f'{pos}\t{word.title()}\t_\t_\t{tag}\t_\t_\t_\t_\t_\n')
+            lines.append('\n')
+        lines = [*lines, '# newdoc id = second\n', "1-2\tCan't\t_\t_\t_\t_\t_\t_\t_\t_\n", *lines[1:20]]
+        for i, (structured, expected) in enumerate([
+            (False, [TOKENS, TOKENS[:1]]),
+            (True, [[[Token.parse(t) for t in s] for s in TOKENS], [[Token.parse(t) for t in TOKENS[0]]]]),
+        ]):
+            with self.subTest(i=i, params=(structured, expected)):
+                result = list(parse_conll(lines, structured))
+
+                assert_that(result, 'parse_conll').is_equal_to(expected)
+
+    def test__parse_docbin(self):
+        # spaCy 2 stores no sentence boundaries unless asked to, and has no tags= or sent_starts= on Doc
+        vocab, docs = spacy.blank('en').vocab, DocBin(attrs=['ORTH', 'TAG', 'SENT_START'])
+        for cluster in [TOKENS, TOKENS[2:]]:
+            fields = [(token.rsplit(':', 2), pos == 0) for sentence in cluster
+                      for pos, token in enumerate([*sentence[1:-1], '.:.:_'])]
+            doc = Doc(vocab, words=[word.title() for (word, _, _), _ in fields])
+            for token, ((_, tag, _), start) in zip(doc, fields):
+                token.tag_ = tag
+                token.is_sent_start = start
+            docs.add(doc)
+
+        assert_that(list(parse_docbin(docs.to_bytes())), 'parse_docbin').is_equal_to([TOKENS, TOKENS[2:]])
@@ -1,13 +1,29 @@
+import io
+import itertools
 from unittest import TestCase
 
 from assertpy import assert_that
 
+from code import Bounds
+from code import Compressor
+from code import LazyWeights
+from code import Token
+from code import WordGraph
 from code import advanced_weight
+from code import bound
+from code import condense
+from code import dedupe
 from code import encode
+from code import explore
 from code import naive_weight
 from code import parse
+from code import parse_many
+from code import render
 from code import report
+from code import search
+from code import summarise
 from code import traverse
+from code import weigh
 
 SENTENCES = """
 The wife of a former U.S. president Bill Clinton, Hillary Clinton, visited China last Monday.
@@ -302,10 +318,55 @@ class MainTest(TestCase):
 
                 assert_that(result, 'parse').is_equal_to(expected)
 
+    def test__parse_structured(self):
+        result = parse(SENTENCES, structured=True)
+
+        assert_that(result, 'parse').is_equal_to([[Token.parse(t) for t in s] for s in TOKENS])
+
+    def test__token(self):
+        for i, (text, expected, verb) in enumerate([
+            ('<START>', Token('<START>'), False),
+            ('visited:VBD:_', Token('visited', 'VBD', False), True),
+            ('the:DT:*', Token('the', 'DT', True), False),
+            ('10:30:CD:_', Token('10:30', 'CD', False), False),
+            ('u.s.:NNP:_', Token('u.s.', 'NNP', False), False),
+        ]):
+            with self.subTest(i=i, params=(text, expected, verb)):
+                result = Token.parse(text)
+
+                assert_that(result, 'parse').is_equal_to(expected)
+                assert_that(result.verb, 'verb').is_equal_to(verb)
+                assert_that(str(result), 'str').is_equal_to(text)
+                assert_that(Token.node(f'{text}:12'), 'node').is_equal_to(expected)
+                assert_that(Token.node(text), 'node').is_equal_to(expected)
+
+    def test__render(self):
+        for i, (summary, expected) in enumerate([
+            ([], ''),
+            (['hillary:NNP:_:9', 'clinton:NNP:_:8', 'visited:VBD:_:10'], 'hillary clinton visited'),
+            (['at:IN:*:3', '10:30:CD:_:4'], 'at 10:30'),
+        ]):
+            with self.subTest(i=i, params=(summary, expected)):
+                result = render(summary)
+
+                assert_that(result, 'render').is_equal_to(expected)
+
+    def test__parse_many(self):
+        for i, (clusters, expected) in enumerate([
+            ([], []),
+            (['', '  \n  \n  \n  '], [[], []]),
+            ([SENTENCES, '', SENTENCES], [TOKENS, [], TOKENS]),
+        ]):
+            with self.subTest(i=i, params=(clusters, expected)):
+                result = list(parse_many(clusters, batch_size=2))
+
+                assert_that(result, 'parse_many').is_equal_to(expected)
+
     def test__encode(self):
         for i, (tokens, exp_graph, exp_table) in enumerate([
             ([], {}, {}),
             (TOKENS, GRAPH, TABLE),
+            ([[Token.parse(t) for t in s] for s in TOKENS], GRAPH, TABLE),
         ]):
             with self.subTest(i=i, params=(tokens, exp_graph, exp_table)):
                 graph, table = encode(tokens)
@@ -313,6 +374,59 @@ class MainTest(TestCase):
                 assert_that(graph, 'encode').is_equal_to(exp_graph)
                 assert_that(table, 'encode').is_equal_to(exp_table)
 
+    def test__dedupe(self):
+        variant = [t if t != 'monday:NNP:_' else 'tuesday:NNP:_' for t in TOKENS[0]]
+        repeated = ['<START>', 'very:RB:_', 'very:RB:_', 'very:RB:_', 'good:JJ:_', 'news:NN:_', '<END>']
+        related = ['<START>', 'very:RB:_', 'good:JJ:_', '<END>']
+        for i, (tokens, threshold, exp_sentences, exp_members) in enumerate([
+            ([], 0.8, [], []),
+            (TOKENS, 0.8, TOKENS, [[0], [1], [2], [3]]),
+            ([TOKENS[2], *TOKENS, TOKENS[2]], 1.0, TOKENS[2:3] + TOKENS[:2] + TOKENS[3:], [[0, 3, 5], [1], [2], [4]]),
+            ([*TOKENS, variant], 0.8, TOKENS, [[0, 4], [1], [2], [3]]),
+            ([*TOKENS, variant], 0.9, [*TOKENS, variant], [[0], [1], [2], [3], [4]]),
+            ([repeated, TOKENS[1], repeated, related, TOKENS[1], related], 1.0,
+             [repeated, TOKENS[1], repeated, related, related], [[0], [1, 4], [2], [3], [5]]),
+            ([repeated, related, repeated, related], 0.5, [repeated, related, repeated, related], [[0], [1], [2], [3]]),
+        ]):
+            with self.subTest(i=i, params=(tokens, threshold, exp_sentences, exp_members)):
+                sentences, members = dedupe(tokens, threshold)
+
+                assert_that(sentences, 'dedupe').is_equal_to(exp_sentences)
+                assert_that(members, 'dedupe').is_equal_to(exp_members)
+
+    def test__encode_members(self):
+        repeated = ['<START>', 'very:RB:_', 'very:RB:_', 'very:RB:_', 'good:JJ:_', 'news:NN:_', '<END>']
+        related = ['<START>', 'very:RB:_', 'good:JJ:_', '<END>']
+        for i, tokens in enumerate([
+            [*TOKENS, TOKENS[1], *TOKENS[::-1]],
+            [repeated, TOKENS[1], repeated, related, related, TOKENS[1]],
+        ]):
+            with self.subTest(i=i, params=tokens):
+                graph, table = encode(*dedupe(tokens, 1.0))
+
+                assert_that(graph, 'encode').is_equal_to(encode(tokens)[0])
+                assert_that(list(graph), 'encode').is_equal_to(list(encode(tokens)[0]))
+                assert_that(table, 'encode').is_equal_to(encode(tokens)[1])
+                assert_that(advanced_weight(graph, table), 'weights').is_equal_to(advanced_weight(*encode(tokens)))
+
+    def test__word_graph(self):
+        for i, (batches, scheme, expected) in enumerate([
+            ([TOKENS], 'naive', NAIVE_WEIGHT),
+            ([TOKENS], 'advanced', ADVANCE_WEIGHT),
+            ([TOKENS[:1], [], TOKENS[1:3], TOKENS[3:]], 'naive', NAIVE_WEIGHT),
+            ([TOKENS[:1], [], TOKENS[1:3], TOKENS[3:]], 'advanced', ADVANCE_WEIGHT),
+        ]):
+            with self.subTest(i=i, params=(batches, scheme, expected)):
+                words = WordGraph()
+                for batch in batches:
+                    words.add_sentences(batch)
+                    words.weigh(scheme)
+
+                assert_that(words.graph, 'add_sentences').is_equal_to(GRAPH)
+                assert_that(words.table, 'add_sentences').is_equal_to(TABLE)
+                assert_that(words.weigh(scheme), 'weigh').is_equal_to(expected)
+                assert_that(words.traverse(scheme, 5, 6), 'traverse').is_equal_to(traverse(expected, 5, 6))
+
     def test__naive_weight(self):
         for i, (graph, expected) in enumerate([
             ({}, {}),
@@ -333,6 +447,23 @@ class MainTest(TestCase):
 
                 assert_that(result, 'advanced_weight').is_equal_to(expected)
 
+    def test__lazy_weights(self):
+        for i, (scheme, expected, summaries) in enumerate([
+            ('naive', NAIVE_WEIGHT, NAIVE_SUMMARIES),
+            ('advanced', ADVANCE_WEIGHT, ADVANCE_SUMMARIES),
+        ]):
+            with self.subTest(i=i, params=(scheme, expected, summaries)):
+                weights = LazyWeights(GRAPH, TABLE, scheme)
+                result = search(weights, 5, 6)
+
+                assert_that(result, 'search').is_equal_to((summaries, True))
+                assert_that(len(weights), 'weighted').is_less_than(len(GRAPH))
+                assert_that({tail: expected[tail] for tail in weights}, 'weighted').is_equal_to(dict(weights))
+                assert_that(weights['<START>'], 'weighted').is_equal_to(expected['<START>'])
+
+    def test__lazy_weights_unknown(self):
+        assert_that(LazyWeights).raises(ValueError).when_called_with(GRAPH, TABLE, 'unknown')
+
     def test__traverse(self):
         for i, (weight, results, length, expected) in enumerate([
             ({}, 0, 6, []),
@@ -350,6 +481,145 @@ class MainTest(TestCase):
 
                 assert_that(result, 'traverse').is_equal_to(expected)
 
+    def test__bound(self):
+        graph = {
+            '<START>': {'a:NN:_': 0.5, 'b:NN:_': 0.25},
+            'a:NN:_': {'c:VBD:_': 1.0},
+            'b:NN:_': {'<END>': 0.0},
+            'c:VBD:_': {'<END>': 0.5},
+        }
+        nodes = ['<START>', 'a:NN:_', 'b:NN:_', 'c:VBD:_']
+        for i, (weight, min_len, expected) in enumerate([
+            ({}, 0, Bounds([{'<START>': 0.0}], {}, True)),
+            (graph, 0, Bounds([dict.fromkeys(nodes, 0.0)], {'<START>': 1.5, 'a:NN:_': 1.0, 'c:VBD:_': 0.0}, True)),
+            (graph, 2, Bounds([
+                dict.fromkeys(nodes, 0.0),
+                {'<START>': 0.25, 'a:NN:_': 1.0, 'b:NN:_': float('inf'), 'c:VBD:_': float('inf')},
+                {'<START>': 1.5, 'a:NN:_': float('inf'), 'b:NN:_': float('inf'), 'c:VBD:_': float('inf')},
+            ], {'<START>': 1.5, 'a:NN:_': 1.0, 'c:VBD:_': 0.0}, True)),
+            ({'<START>': {'a:VB:_': -1.0}}, 1, Bounds([
+                {'<START>': 0.0, 'a:VB:_': 0.0},
+                {'<START>': 0.0, 'a:VB:_': float('inf')},
+            ], {'<START>': 0.0, 'a:VB:_': 0.0}, False)),
+        ]):
+            with self.subTest(i=i, params=(weight, min_len, expected)):
+                result = bound(weight, min_len)
+
+                assert_that(result, 'bound').is_equal_to(expected)
+
+    def test__search_bounds(self):
+        graph = {'<START>': {'a:NN:_': -0.5, 'b:NN:_': -0.25}, 'a:NN:_': {'c:VBD:_': -1.0}, 'c:VBD:_': {'<END>': 0}}
+        for i, (weight, min_len, bounds, expected) in enumerate([
+            (NAIVE_WEIGHT, 6, bound(NAIVE_WEIGHT, 6), NAIVE_SUMMARIES),
+            (NAIVE_WEIGHT, 6, bound(NAIVE_WEIGHT, 2), NAIVE_SUMMARIES),
+            (ADVANCE_WEIGHT, 6, bound(ADVANCE_WEIGHT, 0), ADVANCE_SUMMARIES),
+            (graph, 2, None, [(['a:NN:_', 'c:VBD:_'], -0.75)]),
+            (graph, 3, None, []),
+        ]):
+            with self.subTest(i=i, params=(weight, min_len, bounds, expected)):
+                result = search(weight, 5, min_len, bounds=bounds)
+
+                assert_that(result, 'search').is_equal_to((expected, True))
+
+    def test__search(self):
+        for i, (weight, timeout, budget, expected, complete) in enumerate([
+            ({}, None, None, [], True),
+            (NAIVE_WEIGHT, None, None, NAIVE_SUMMARIES, True),
+            (NAIVE_WEIGHT, None, 10000, NAIVE_SUMMARIES, True),
+            (NAIVE_WEIGHT, 60, None, NAIVE_SUMMARIES, True),
+            (NAIVE_WEIGHT, None, 0, [], False),
+            (NAIVE_WEIGHT, -1, None, [], False),
+            (ADVANCE_WEIGHT, None, 0, [], False),
+            (ADVANCE_WEIGHT, None, 10000, ADVANCE_SUMMARIES, True),
+        ]):
+            with self.subTest(i=i, params=(weight, timeout, budget, expected, complete)):
+                result = search(weight, 5, 6, timeout=timeout, budget=budget)
+
+                assert_that(result, 'search').is_equal_to((expected, complete))
+
+    def test__summarise(self):
+        for i, (weighting, budget, expected, complete) in enumerate([
+            ('naive', None, NAIVE_SUMMARIES, True),
+            ('advanced', None, ADVANCE_SUMMARIES, True),
+            ('advanced', 0, [], False),
+        ]):
+            with self.subTest(i=i, params=(weighting, budget, expected, complete)):
+                result = summarise(TOKENS, weighting, 5, 6, budget=budget)
+
+                assert_that(result, 'summarise').is_equal_to((expected, complete))
+                assert_that(condense(TOKENS, weighting, 5, 6, budget=budget), 'condense').is_equal_to(expected)
+
+    def test__explore(self):
+        for i, (weight, budget, expected, exhausted) in enumerate([
+            ({}, None, [], True),
+            (NAIVE_WEIGHT, None, None, True),
+            (NAIVE_WEIGHT, 0, [], False),
+            (ADVANCE_WEIGHT, 10, ADVANCE_SUMMARIES[:4], False),
+        ]):
+            with self.subTest(i=i, params=(weight, budget, expected, exhausted)):
+                stats = {}
+                result = list(explore(weight, 6, budget=budget, stats=stats))
+
+                assert_that(result[:5], 'explore').is_equal_to(NAIVE_SUMMARIES if expected is None else expected)
+                assert_that(stats, 'explore').contains_entry({'exhausted': exhausted})
+
+    def test__explore_lazy(self):
+        stats = {}
+        stream = explore(ADVANCE_WEIGHT, 6, stats=stats)
+        first, expanded = next(stream), stats['expanded']
+        rest = list(itertools.islice(stream, 4))
+
+        assert_that([first, *rest], 'explore').is_equal_to(ADVANCE_SUMMARIES)
+        assert_that(expanded, 'explore').is_less_than(stats['expanded'])
+
+    def test__explore_cycles(self):
+        nodes = [f"w{idx}:VB:_:{idx}" for idx in range(70)]
+        graph = {'<START>': {nodes[0]: 0.0},
+                 **{tail: {head: 0.1, nodes[0]: 0.0} for tail, head in zip(nodes, nodes[1:])}}
+        result = [path for path, _ in explore(graph, 1)]
+
+        assert_that(result, 'explore').is_length(len(nodes) - 1)
+        assert_that(result[-1], 'explore').is_equal_to(nodes[:-1])
+        assert_that([path for path in result if len(set(path)) < len(path)], 'explore').is_empty()
+
+    def test__compressor(self):
+        for i, (lazy, queries) in enumerate([
+            (False, []),
+            (False, [('naive', 5, 6), ('advanced', 5, 6), ('advanced', 2, 6), ('naive', 0, 6)]),
+            (False, [('advanced', 3, 2), ('advanced', 5, 6), ('naive', 5, 50), ('advanced', -1, 4)]),
+            (True, [('advanced', 2, 6), ('naive', 5, 6), ('advanced', 5, 6)]),
+        ]):
+            with self.subTest(i=i, params=(lazy, queries)):
+                compressor = Compressor(GRAPH, TABLE, lazy)
+                result = compressor.answer(queries)
+
+                expected = [traverse(weigh(GRAPH, TABLE, w), n, m) for w, n, m in queries]
+                assert_that(result, 'answer').is_equal_to(expected)
+                assert_that(compressor.weights, 'weights').is_length(len({w for w, _, _ in queries}))
+
+    def test__compressor_resume(self):
+        compressor = Compressor(GRAPH, TABLE)
+        preview = compressor.query('advanced', 2, 6)
+        _, stats, _ = compressor.streams['advanced', 6]
+        expanded = stats['expanded']
+        full = compressor.query('advanced', 5, 6)
+
+        assert_that(preview, 'query').is_equal_to(ADVANCE_SUMMARIES[:2])
+        assert_that(full, 'query').is_equal_to(ADVANCE_SUMMARIES)
+        assert_that(compressor.query('advanced', 3, 6), 'query').is_equal_to(ADVANCE_SUMMARIES[:3])
+        assert_that(stats['expanded'], 'resume').is_greater_than(expanded)
+        assert_that(compressor.streams, 'resume').is_length(1)
+        assert_that(compressor.bound('advanced', 2), 'bound').is_same_as(compressor.bound('advanced', 6))
+
+    def test__search_anytime(self):
+        for weight, expected in [(NAIVE_WEIGHT, NAIVE_SUMMARIES), (ADVANCE_WEIGHT, ADVANCE_SUMMARIES)]:
+            for budget in range(0, 200, 5):
+                with self.subTest(params=(budget, expected)):
+                    result, complete = search(weight, 5, 6, budget=budget)
+
+                    assert_that(result, 'search').is_equal_to(expected[:len(result)])
+                    assert_that(complete, 'search').is_equal_to(result == expected)
+
     # noinspection PyBroadException
     def test__report(self):
         for i, summaries in enumerate([
@@ -364,3 +634,28 @@ class MainTest(TestCase):
                     assert_that(False, 'report').is_true()
                 else:
                     assert_that(True, 'report').is_true()
+
+    def test__report_output(self):
+        summaries = [(['hillary:NNP:_:9', 'visited:VBD:_:10'], 0.5), (['clinton:NNP:_:8', 'paid:VBD:_:24'], 0.25)]
+        for i, (structured, ranked, expected) in enumerate([
+            (False, True, ['        1. (cost: 0.250) clinton paid', '        2. (cost: 0.500) hillary visited']),
+            (False, False, ['        1. (cost: 0.500) hillary visited', '        2. (cost: 0.250) clinton paid']),
+            (True, True, [
+                '{"rank": 1, "summary": "clinton paid", "cost": 0.25, "tokens": ["clinton:NNP:_:8", "paid:VBD:_:24"]}',
+                '{"rank": 2, "summary": "hillary visited", "cost": 0.5, '
+                '"tokens": ["hillary:NNP:_:9", "visited:VBD:_:10"]}',
+            ]),
+        ]):
+            with self.subTest(i=i, params=(structured, ranked, expected)):
+                output = io.StringIO()
+                report(summaries, output=output, structured=structured, ranked=ranked)
+
+                assert_that(output.getvalue().splitlines(), 'report').is_equal_to(expected)
+
+    def test__report_stream(self):
+        stream = explore(NAIVE_WEIGHT, 6)
+        output = io.StringIO()
+        report(stream, num_results=2, output=output, ranked=False)
+
+        assert_that(output.getvalue().splitlines(), 'report').is_length(2)
+        assert_that(next(stream), 'report').is_equal_to(NAIVE_SUMMARIES[2])
@@ -0,0 +1,67 @@
+from unittest import TestCase
+
+from assertpy import assert_that
+
+from code import condense
+from engine import Outcome
+from pipeline import STAGES
+from pipeline import Pipeline
+from test_main import TOKENS
+
+
+# noinspection PyMethodMayBeStatic
+class PipelineTest(TestCase):
+
+    def test__run(self):
+        clusters = [TOKENS, [], TOKENS[1:], TOKENS * 3, TOKENS[:2]]
+        expected = [Outcome(condense(c, num_results=3, min_len=6)) for c in clusters]
+        for i, (workers, queue_size, processes) in enumerate([
+            ((1, 1, 1, 1), 1, False),
+            ((2, 2, 1, 3), 2, False),
+            ((1, 2, 1, 2), 1, True),
+        ]):
+            with self.subTest(i=i, params=(workers, queue_size, processes)):
+                with Pipeline(workers, queue_size, num_results=3, min_len=6, processes=processes) as pipeline:
+                    result = list(pipeline.run(clusters))
+
+                assert_that(result, 'run').is_equal_to(expected)
+
+    def test__failure(self):
+        with Pipeline(processes=False, min_len=6) as pipeline:
+            result = list(pipeline.run([TOKENS, None, TOKENS]))
+
+        assert_that(result[0], 'run').is_equal_to(result[2])
+        assert_that(result[0].error, 'run').is_none()
+        assert_that(result[1].summaries, 'run').is_empty()
+        assert_that(result[1].error, 'run').starts_with('TypeError')
+        assert_that(result[1].complete, 'run').is_false()
+
+    def test__backpressure(self):
+        pulled = []
+
+        def clusters():
+            for idx in range(100):
+                pulled.append(idx)
+                yield TOKENS
+
+        with Pipeline(queue_size=1, processes=False, min_len=6) as pipeline:
+            stream = pipeline.run(clusters())
+            first = next(stream)
+            waiting = len(pulled)
+            stream.close()
+            result = list(pipeline.run([TOKENS]))
+
+        assert_that(first, 'run').is_equal_to(Outcome(condense(TOKENS, min_len=6)))
+        assert_that(waiting, 'backpressure').is_less_than_or_equal_to(len(STAGES) * 2 + 3)
+        assert_that(len(pulled), 'cancel').is_less_than(100)
+        assert_that(result, 'run').is_equal_to([first])
+
+    def test__report(self):
+        with Pipeline((1, 2, 1, 1), processes=False, min_len=6) as pipeline:
+            list(pipeline.run([TOKENS] * 5))
+            report = pipeline.report()
+
+        assert_that(report, 'report').contains_only(*STAGES)
+        for name, usage in report.items():
+            assert_that(usage, name).contains_entry({'items': 5}, {'workers': 2 if name == 'encode' else 1})
+            assert_that(usage['utilisation'], name).is_between(0.0, 1.0)
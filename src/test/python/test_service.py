@@ -0,0 +1,104 @@
+import asyncio
+import json
+from unittest import TestCase
+
+from assertpy import assert_that
+
+from code import compress
+from code import render
+from service import Job
+from service import Service
+from test_main import SENTENCES
+from utils import METRICS
+from utils import MemorySink
+
+
+async def fetch(port: int, method: str, path: str, body: bytes = b'') -> tuple:
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n'.encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, content = response.partition(b'\r\n\r\n')
+
+    return int(head.split()[1]), content
+
+
+# noinspection PyMethodMayBeStatic
+class ServiceTest(TestCase):
+
+    def test__compress(self):
+        clusters = [SENTENCES, '', SENTENCES.upper(), SENTENCES]
+
+        async def scenario():
+            async with Service(port=0, workers=2, max_batch=3, max_wait=0.05, num_results=3, min_len=6) as service:
+                responses = await asyncio.gather(*(
+                    fetch(service.port, 'POST', '/compress', json.dumps({'text': c}).encode()) for c in clusters))
+                return responses, service.health()
+
+        responses, health = asyncio.run(scenario())
+
+        for cluster, (status, content) in zip(clusters, responses):
+            expected = [{'summary': render(s), 'cost': c} for s, c in compress(cluster, num_results=3, min_len=6)]
+            assert_that(status, 'compress').is_equal_to(200)
+            assert_that(json.loads(content), 'compress').is_equal_to({'summaries': expected, 'complete': True})
+        assert_that(health['requests'], 'health').is_equal_to(4)
+        assert_that(health['batched'], 'health').is_equal_to(4)
+        assert_that(health['batches'], 'health').is_less_than(4)
+
+    def test__respond(self):
+        for i, (method, path, body, expected) in enumerate([
+            ('GET', '/health', b'', 200),
+            ('GET', '/metrics', b'', 200),
+            ('GET', '/nowhere', b'', 404),
+            ('GET', '/compress', b'', 405),
+            ('POST', '/compress', b'{', 400),
+            ('POST', '/compress', b'[]', 400),
+            ('POST', '/compress', b'{"text": "Hello.", "weighting": "fancy"}', 400),
+            ('POST', '/compress', b'{"sentences": ["Hello."], "min_len": "8"}', 400),
+            ('POST', '/compress', b'{"sentences": [1, 2]}', 400),
+            ('POST', '/compress', b'{"sentences": "abc"}', 400),
+            ('POST', '/compress', b'{"text": 5}', 400),
+            ('POST', '/compress', b'x' * 100, 413),
+        ]):
+            with self.subTest(i=i, params=(method, path, body, expected)):
+                async def scenario():
+                    async with Service(port=0, workers=1, max_body=64) as service:
+                        return await fetch(service.port, method, path, body)
+
+                status, _ = asyncio.run(scenario())
+
+                assert_that(status, 'respond').is_equal_to(expected)
+
+    def test__metrics(self):
+        async def scenario():
+            async with Service(port=0, workers=1, min_len=6) as service:
+                payload = json.dumps({'text': SENTENCES, 'sentences': 5}).encode()
+                status, _ = await fetch(service.port, 'POST', '/compress', payload)
+                _, content = await fetch(service.port, 'GET', '/metrics')
+                return status, content.decode()
+
+        METRICS.enable(MemorySink())
+        try:
+            status, content = asyncio.run(scenario())
+        finally:
+            METRICS.disable().sinks.clear()
+            METRICS.reset()
+
+        assert_that(status, 'compress').is_equal_to(200)
+        for stage in ('parse_many', 'encode', 'advanced_weight', 'traverse'):
+            assert_that(content, stage).contains(f'msc_{stage}_seconds_count 1')
+
+    def test__backpressure(self):
+        async def scenario():
+            async with Service(port=0, workers=1, queue_size=1) as service:
+                service.batcher.cancel()
+                service.queue.put_nowait(Job('', 'naive', 5, 8, asyncio.get_running_loop().create_future()))
+                status, content = await fetch(service.port, 'POST', '/compress', b'{"text": "Hello."}')
+                return status, service.health()
+
+        status, health = asyncio.run(scenario())
+
+        assert_that(status, 'compress').is_equal_to(503)
+        assert_that(health['rejected'], 'health').is_equal_to(1)
+        assert_that(health['queued'], 'health').is_equal_to(1)
@@ -0,0 +1,63 @@
+import os
+import tempfile
+from unittest import TestCase
+
+from assertpy import assert_that
+
+from compact import traverse
+from storage import Store
+from storage import save
+from test_main import ADVANCE_SUMMARIES
+from test_main import ADVANCE_WEIGHT
+from test_main import GRAPH
+from test_main import NAIVE_SUMMARIES
+from test_main import NAIVE_WEIGHT
+from test_main import TABLE
+
+
+# noinspection PyMethodMayBeStatic
+class StorageTest(TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, 'graph.bin')
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test__round_trip(self):
+        for i, (graph, table, weights) in enumerate([
+            ({}, {}, {}),
+            (GRAPH, TABLE, {}),
+            (GRAPH, TABLE, {'naive': NAIVE_WEIGHT, 'advanced': ADVANCE_WEIGHT}),
+        ]):
+            with self.subTest(i=i, params=(graph, table, weights)):
+                save(self.path, graph, table, weights)
+                with Store(self.path) as store:
+                    assert_that(store.graph(), 'graph').is_equal_to(graph)
+                    assert_that(list(store.graph()), 'graph').is_equal_to(list(graph))
+                    assert_that(store.table(), 'table').is_equal_to(table)
+                    assert_that(store.weightings(), 'weightings').is_equal_to(list(weights))
+                    for weighting, expected in weights.items():
+                        assert_that(store.weighted(weighting), weighting).is_equal_to(expected)
+
+    def test__traverse(self):
+        save(self.path, GRAPH, TABLE, {'naive': NAIVE_WEIGHT, 'advanced': ADVANCE_WEIGHT})
+        with Store(self.path) as store:
+            assert_that(traverse(store.compact('naive'), 5, 6), 'naive').is_equal_to(NAIVE_SUMMARIES)
+            assert_that(traverse(store.compact('advanced'), 5, 6), 'advanced').is_equal_to(ADVANCE_SUMMARIES)
+
+    def test__invalid(self):
+        for i, content in enumerate([
+            b'',
+            b'XXXX' + bytes(44),
+            b'MSCG\x02\x00' + bytes(42),
+        ]):
+            with self.subTest(i=i, params=content):
+                with open(self.path, 'wb') as f:
+                    f.write(content)
+
+                assert_that(Store).raises(ValueError).when_called_with(self.path)
+
+    def test__unknown_weighting(self):
+        assert_that(save).raises(ValueError).when_called_with(self.path, GRAPH, TABLE, {'other': NAIVE_WEIGHT})
@@ -0,0 +1,108 @@
+import io
+import json
+import os
+import pickle
+import tempfile
+from unittest import TestCase
+
+from assertpy import assert_that
+
+from code import encode
+from code import traverse
+from test_main import NAIVE_WEIGHT
+from test_main import TOKENS
+from utils import METRICS
+from utils import JsonLinesSink
+from utils import MemorySink
+from utils import Metrics
+from utils import Model
+from utils import PrometheusSink
+from utils import Timer
+
+
+# noinspection PyMethodMayBeStatic
+class MetricsTest(TestCase):
+
+    def tearDown(self):
+        METRICS.disable().sinks.clear()
+        METRICS.reset()
+
+    def test__disabled(self):
+        sink = MemorySink()
+        METRICS.sinks.append(sink)
+        encode(TOKENS)
+
+        assert_that(sink.events, 'disabled').is_empty()
+
+    def test__stages(self):
+        sink = MemorySink()
+        METRICS.enable(sink)
+        encode(TOKENS)
+        traverse(NAIVE_WEIGHT, 5, 6)
+
+        assert_that([event['stage'] for event in sink.events], 'stages').is_equal_to(['encode', 'traverse'])
+        assert_that(sink.events[0], 'encode').contains_entry({'sentences': 4}, {'tokens': 54}, {'candidates': 16})
+        assert_that(sink.events[0], 'encode').contains_key('seconds', 'tokens_per_second')
+        assert_that(sink.events[1], 'traverse').contains_entry({'results': 5})
+        assert_that(sink.events[1], 'traverse').contains_key('expanded', 'pruned', 'peak_fringe')
+
+    def test__json_lines(self):
+        target = io.StringIO()
+        METRICS.enable(JsonLinesSink(target))
+        traverse(NAIVE_WEIGHT, 5, 6)
+        METRICS.flush()
+
+        assert_that([json.loads(line)['stage'] for line in target.getvalue().splitlines()], 'json').is_equal_to(
+            ['traverse'])
+
+    def test__prometheus(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'metrics.prom')
+            metrics = Metrics([PrometheusSink(path)], buckets=(0.5, 1.0))
+            metrics.record('encode', 0.7, tokens=10)
+            metrics.record('encode', 0.2, tokens=5, peak_fringe=3)
+            metrics.flush()
+            with open(path, encoding='utf-8') as f:
+                lines = f.read().splitlines()
+
+        assert_that(lines, 'prometheus').contains(
+            'msc_encode_seconds_bucket{le="0.5"} 1',
+            'msc_encode_seconds_bucket{le="1.0"} 2',
+            'msc_encode_seconds_bucket{le="+Inf"} 2',
+            'msc_encode_seconds_count 2',
+            'msc_encode_tokens_total 15',
+            'msc_encode_peak_fringe 3',
+        )
+
+    def test__merge(self):
+        worker, metrics = Metrics([MemorySink()], buckets=(0.5, 1.0)), Metrics([MemorySink()], buckets=(0.5, 1.0))
+        worker.record('encode', 0.75, tokens=10, peak_fringe=2)
+        metrics.record('encode', 0.25, tokens=5, peak_fringe=3)
+        metrics.merge(worker.drain())
+        metrics.merge(worker.drain())
+
+        assert_that(worker.histograms, 'drain').is_empty()
+        assert_that(metrics.histograms['encode'], 'merge').is_equal_to({'buckets': [1, 1, 0], 'sum': 1.0, 'count': 2})
+        assert_that(metrics.totals['encode'], 'merge').is_equal_to({'tokens': 15, 'peak_fringe': 3})
+
+    def test__timer(self):
+        with Timer('block', verbose=False, profile=True, trace=True) as timer:
+            encode(TOKENS)
+        elapsed = timer()
+
+        assert_that(timer(), 'timer').is_equal_to(elapsed)
+        assert_that(timer.stats.total_calls, 'profile').is_greater_than(0)
+        assert_that(timer.counters['peak_kb'], 'trace').is_greater_than(0)
+
+
+# noinspection PyMethodMayBeStatic
+class ModelTest(TestCase):
+
+    def test__configure(self):
+        model = Model()
+        model.nlp = object()
+
+        assert_that(model.configure(fast=False).nlp, 'configure').is_not_none()
+        assert_that(model.configure(fast=True).nlp, 'configure').is_none()
+        assert_that(pickle.loads(pickle.dumps(model)).__getstate__(), 'pickle').is_equal_to(
+            {'name': 'en_core_web_sm', 'disable': ('ner',), 'fast': True})